@@ -0,0 +1,169 @@
+'''
+This script compares the single-pass page extractor against the original BeautifulSoup
+parser of College Results Online profile pages. It checks that both return the same
+dictionary for every saved page and prints the average parse time of each.
+
+Usage: python bench_page_extractor.py PAGE.html [PAGE.html ...]
+'''
+import sys
+import timeit
+from pathlib import Path
+
+from bs4 import BeautifulSoup
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+# pylint: disable=wrong-import-position
+from graduation_rates.page_extractor import extract_college_fields, str_to_int
+# pylint: enable=wrong-import-position
+
+def legacy_parse_college_page(page, link):
+    '''
+    The original BeautifulSoup parser, which searches the whole tree for .data cells once
+    per field. Kept here as the reference the extractor is compared against.
+
+    Parameters
+    ----------
+    page : The HTML text of the profile page.
+    link : The unique part of the link for the university.
+
+    Returns
+    -------
+    A dictionary of scraped data for the univerisity.
+    '''
+    soup = BeautifulSoup(page, "lxml")
+
+    headers = ["ipeds_id", "college_name", "state", "size_undergrads", "percent_admitted",
+               "in_state_tuition", "out_state_tuition", "sector", "average_gpa",
+               "percent_part_time", "admission_test", "median_sat_verbal", "median_sat_math",
+               "median_act_composite", "percent_underrep_minority", "pell_percent",
+               "retention_rate", "four_year_grad_rate", "five_year_grad_rate", "six_year_grad_rate"]
+
+    #ipeds_id
+    ipeds_id = link
+
+    # Name of college
+    college_name = soup.find('h2').text
+
+    # State
+    state = soup.find_all(class_='data')[3].text
+
+    # Size of undergrads
+    raw_size_undergrads = soup.find_all(class_='data')[13].text.replace(",", "")
+    size_undergrads = str_to_int(raw_size_undergrads)
+
+    # Percent Admitted
+    raw_percent_admitted = soup.find_all(class_='data')[26].text[:-1]
+    percent_admitted = str_to_int(raw_percent_admitted)
+
+    # In-State Tuition and Fees
+    raw_in_state_tuition = soup.find_all(class_='data')[27].text[1:].replace(",", "")
+    in_state_tuition = str_to_int(raw_in_state_tuition)
+
+    # Out-of-State Tuition and Fees
+    raw_out_state_tuition = soup.find_all(class_='data')[28].text[1:].replace(",", "")
+    out_state_tuition = str_to_int(raw_out_state_tuition)
+
+    # Sector (public or private)
+    sector = soup.find_all(class_='data')[11].text
+
+    # Average High School GPA Among College Freshmen
+    raw_average_gpa = soup.find_all(class_='data')[19].text
+    average_gpa = str_to_int(raw_average_gpa)
+
+    # % Part time
+    raw_percent_part_time = soup.find_all(class_='data')[49].text[:-1]
+    percent_part_time = str_to_int(raw_percent_part_time)
+
+    # Admission Test Scores Policy
+    admission_test = soup.find_all(class_='data')[20].text
+
+    # Median SAT Verbal
+    raw_median_sat_verbal = soup.find_all(class_='data')[21].text[:3]
+    median_sat_verbal = str_to_int(raw_median_sat_verbal)
+
+    # Median SAT Math
+    raw_median_sat_math = soup.find_all(class_='data')[22].text[:3]
+    median_sat_math = str_to_int(raw_median_sat_math)
+
+    # Median ACT Composite
+    raw_median_act_composite = soup.find_all(class_='data')[24].text[:4]
+    median_act_composite = str_to_int(raw_median_act_composite)
+
+    # % Underrepresented minority
+    raw_percent_underrep_minority = soup.find_all(class_='data')[36].text[:-1]
+    percent_underrep_minority = str_to_int(raw_percent_underrep_minority)
+
+    # Percent Pell grants
+    raw_pell_percent = soup.find_all(class_='data')[35].text[:-1]
+    pell_percent = str_to_int(raw_pell_percent)
+
+    #First-year retention rate
+    raw_retention_rate = soup.find_all(class_='data')[6].text[:-1]
+    retention_rate = str_to_int(raw_retention_rate)
+
+    # Four-year graduation rate
+    raw_four_year_grad_rate = soup.find_all(class_='data')[7].text[:-1]
+    four_year_grad_rate = str_to_int(raw_four_year_grad_rate)
+
+    # Five-year graduation rate
+    raw_five_year_grad_rate = soup.find_all(class_='data')[8].text[:-1]
+    five_year_grad_rate = str_to_int(raw_five_year_grad_rate)
+
+    # Six-year graduation rate
+    raw_six_year_grad_rate = soup.find_all(class_='data')[9].text[:-1]
+    six_year_grad_rate = str_to_int(raw_six_year_grad_rate)
+
+    college_dict = dict(zip(headers, [ipeds_id, college_name, state, size_undergrads,
+                                      percent_admitted, in_state_tuition, out_state_tuition,
+                                      sector, average_gpa, percent_part_time, admission_test,
+                                      median_sat_verbal, median_sat_math, median_act_composite,
+                                      percent_underrep_minority, pell_percent, retention_rate,
+                                      four_year_grad_rate, five_year_grad_rate,
+                                      six_year_grad_rate]))
+
+    return college_dict
+
+
+def benchmark_parsers(pages, repeat=5):
+    '''
+    Times both parsers over the saved pages.
+
+    Parameters
+    ----------
+    pages : A list of (link, HTML text) pairs.
+    repeat : The number of times every page is parsed by each parser.
+
+    Returns
+    -------
+    A dictionary of the average seconds per page for each parser.
+    '''
+    for link, page in pages:
+        if legacy_parse_college_page(page, link) != extract_college_fields(page, link):
+            raise AssertionError(f"Parsers disagree on page {link}")
+
+    timings = {}
+    for name, parser in [("beautifulsoup", legacy_parse_college_page),
+                         ("extractor", extract_college_fields)]:
+        seconds = timeit.timeit(lambda parser=parser: [parser(page, link) for link, page in pages],
+                                number=repeat)
+        timings[name] = seconds / (repeat * len(pages))
+
+    return timings
+
+def main():
+    '''
+    Loads the pages given on the command line and prints the timing of each parser.
+    '''
+    pages = [(path.stem, path.read_text()) for path in map(Path, sys.argv[1:])]
+    if not pages:
+        sys.exit(__doc__)
+
+    timings = benchmark_parsers(pages)
+
+    print(f'BeautifulSoup: {timings["beautifulsoup"] * 1000:.3f} ms per page,\n'
+          f'Extractor: {timings["extractor"] * 1000:.3f} ms per page,\n'
+          f'Speedup: {timings["beautifulsoup"] / timings["extractor"]:.1f}x')
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+'''
+This script load tests a running prediction server. Concurrent clients each hold one
+keep-alive connection and post prediction requests as fast as they are answered. It prints
+the throughput and client-side latency percentiles, followed by the server's /metrics.
+
+Usage: python load_test_prediction_server.py [--port 8080] [--clients 64] [--requests 20000]
+'''
+import argparse
+import asyncio
+import json
+import time
+
+import numpy as np
+
+# Alabama A & M University, with the GPA left for the server to impute
+EXAMPLE_INSTITUTION = {"percent_admitted": 87.4, "out_state_tuition": 17496.0,
+                       "average_gpa": None, "percent_part_time": 8.6,
+                       "median_act_composite": 17.5, "pell_percent": 71.1,
+                       "retention_rate": 58.0, "admission_test": "Required"}
+
+async def request(reader, writer, method, path, payload=None):
+    '''
+    Sends one request on an open connection and returns the decoded JSON response.
+    '''
+    body = json.dumps(payload).encode() if payload is not None else b""
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: localhost\r\n"
+                 f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n"
+                 .encode() + body)
+    await writer.drain()
+
+    status_line = await reader.readline()
+    headers = {}
+    while (line := await reader.readline()) not in (b"\r\n", b""):
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    response = await reader.readexactly(int(headers["content-length"]))
+
+    if b" 200 " not in status_line:
+        raise RuntimeError(f"{status_line.decode().strip()}: {response.decode()}")
+
+    return json.loads(response)
+
+async def run_client(host, port, n_requests, payload, latencies):
+    '''
+    Posts n_requests predictions over one connection, recording each latency.
+    '''
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for _ in range(n_requests):
+            started = time.perf_counter()
+            await request(reader, writer, "POST", "/predict", payload)
+            latencies.append(time.perf_counter() - started)
+    finally:
+        writer.close()
+
+async def load_test(host, port, n_clients, n_requests, batch_size):
+    '''
+    Runs the clients concurrently and prints the results.
+    '''
+    payload = (EXAMPLE_INSTITUTION if batch_size == 1
+               else {"institutions": [EXAMPLE_INSTITUTION] * batch_size})
+    latencies = []
+
+    started = time.perf_counter()
+    await asyncio.gather(*[run_client(host, port, n_requests // n_clients, payload, latencies)
+                           for _ in range(n_clients)])
+    elapsed = time.perf_counter() - started
+
+    p50, p99 = np.percentile(np.array(latencies) * 1000, [50, 99])
+    print(f'Requests: {len(latencies)} in {elapsed:.2f} s,\n'
+          f'Throughput: {len(latencies) / elapsed:.0f} requests/s '
+          f'({len(latencies) * batch_size / elapsed:.0f} predictions/s),\n'
+          f'Client latency p50: {p50:.2f} ms, p99: {p99:.2f} ms')
+
+    reader, writer = await asyncio.open_connection(host, port)
+    print(f'Server metrics: {await request(reader, writer, "GET", "/metrics")}')
+    writer.close()
+
+def main():
+    '''
+    Parses the command line and runs the load test.
+    '''
+    parser = argparse.ArgumentParser(description="Load test the prediction server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--clients", type=int, default=64)
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--batch-size", type=int, default=1,
+                        help="Universities per request.")
+    args = parser.parse_args()
+
+    asyncio.run(load_test(args.host, args.port, args.clients, args.requests, args.batch_size))
+
+if __name__ == "__main__":
+    main()
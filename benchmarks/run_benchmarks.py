@@ -0,0 +1,270 @@
+'''
+This script benchmarks every stage of the pipeline, from parsing profile pages through
+cleaning, cross-validation, the in-memory and streaming final fits and batch prediction.
+Stages run on synthetic frames scaled to multiples of the ~1,600 universities in the current
+data, and the best wall time and the peak traced memory of each stage are reported. Results
+are compared against a stored baseline and the script exits with status 1 when a stage
+regresses.
+
+Usage: python run_benchmarks.py [--scales 1,10,100] [--pages DIR] [--save-baseline]
+'''
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import LinearRegression
+from sklearn.preprocessing import StandardScaler
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+# pylint: disable=wrong-import-position
+from graduation_rates.clean import (clean_college_dataframe, clean_missing_test_scores,
+                                    final_data_cleaning)
+from graduation_rates.model_artifact import build_artifact, predict_batch
+from graduation_rates.models.cross_validation import cross_validate_variants, model_variants
+from graduation_rates.page_extractor import COLLEGE_FIELDS, extract_college_fields
+from graduation_rates.streaming_train import streaming_linear_regression
+from graduation_rates.train import (FEATURE_COLUMNS, TARGET_COLUMN,
+                                    final_linear_regression_model_with_scaling,
+                                    train_test_split_data)
+# pylint: enable=wrong-import-position
+
+BASE_ROWS = 1644
+DEFAULT_BASELINE = Path(__file__).resolve().parent / "baseline.json"
+
+SECTORS = ["Public", "Private not-for-profit", "Private for-profit", "-"]
+ADMISSION_TESTS = ["-", "Considered but not required", "Neither required nor recommended",
+                   "Recommended", "Required"]
+
+def synthetic_profile_page(seed=0):
+    '''
+    Returns the HTML of a profile page laid out like College Results Online, with the values
+    each field of COLLEGE_FIELDS expects in its cell and filler in the others.
+    '''
+    rng = np.random.default_rng(seed)
+    values = {3: "CA", 11: "Public", 13: f"{rng.integers(500, 40000):,}", 19: "3.41",
+              20: "Required", 21: "540-640", 22: "550-650", 24: "24.5-28"}
+    for _, index, parser in COLLEGE_FIELDS:
+        if parser.__name__ == "parse_percent":
+            values[index] = f"{rng.uniform(5, 100):.1f}%"
+        elif parser.__name__ == "parse_dollars":
+            values[index] = f"${rng.integers(5000, 60000):,}"
+
+    rows = "".join(f'<tr><td class="label">Label {index}</td>'
+                   f'<td class="data">{values.get(index, "-")}</td></tr>' for index in range(60))
+    navigation = "".join(f'<li><a href="/page{index}">Link {index}</a></li>'
+                         for index in range(200))
+
+    return (f'<html><head><title>College Results Online</title></head><body><ul>{navigation}'
+            f'</ul><h2>Synthetic University {seed}</h2><table>{rows}</table></body></html>')
+
+def synthetic_college_df(n_rows, seed=0):
+    '''
+    Returns a frame shaped like the output of scrape_college_results_online, with n_rows
+    universities and some missing values in the columns the cleaning stages handle.
+    '''
+    rng = np.random.default_rng(seed)
+    percent_admitted = np.where(rng.random(n_rows) < 0.05, 100.0, rng.uniform(5, 99, n_rows))
+    average_gpa = 3.9 - percent_admitted / 100 + rng.normal(0, 0.15, n_rows)
+    act = 32 - percent_admitted / 10 + rng.normal(0, 2, n_rows)
+    retention = np.clip(95 - percent_admitted / 4 + rng.normal(0, 6, n_rows), 30, 99)
+
+    college_df = pd.DataFrame({
+        "ipeds_id": (100000 + np.arange(n_rows)).astype(str),
+        "Institution_name": [f"University {index}" for index in range(n_rows)],
+        "college_name": [f"University {index}" for index in range(n_rows)],
+        "state": rng.choice(["AL", "CA", "MA", "NY", "TX", "WA"], n_rows),
+        "size_undergrads": rng.integers(300, 50000, n_rows).astype(float),
+        "percent_admitted": percent_admitted,
+        "in_state_tuition": rng.uniform(5000, 60000, n_rows),
+        "out_state_tuition": rng.uniform(10000, 60000, n_rows),
+        "sector": rng.choice(SECTORS, n_rows, p=[0.45, 0.45, 0.07, 0.03]),
+        "average_gpa": average_gpa,
+        "percent_part_time": rng.uniform(0, 60, n_rows),
+        "admission_test": rng.choice(ADMISSION_TESTS, n_rows, p=[0.02, 0.2, 0.08, 0.1, 0.6]),
+        "median_sat_verbal": 420 + act * 6 + rng.normal(0, 20, n_rows),
+        "median_sat_math": 420 + act * 6 + rng.normal(0, 20, n_rows),
+        "median_act_composite": act,
+        "percent_underrep_minority": rng.uniform(0, 90, n_rows),
+        "pell_percent": rng.uniform(5, 80, n_rows),
+        "retention_rate": retention,
+        "four_year_grad_rate": retention * 0.5,
+        "five_year_grad_rate": retention * 0.75 + rng.normal(0, 8, n_rows),
+        "six_year_grad_rate": retention * 0.8,
+    })
+
+    for column in ["average_gpa", "median_sat_verbal", "median_sat_math",
+                   "median_act_composite"]:
+        college_df.loc[rng.random(n_rows) < 0.15, column] = np.nan
+    college_df.loc[rng.random(n_rows) < 0.02, "pell_percent"] = np.nan
+
+    return college_df
+
+def synthetic_model_df(n_rows, seed=0):
+    '''
+    Returns the model features and target of a cleaned synthetic frame.
+    '''
+    college_df = clean_college_dataframe(synthetic_college_df(n_rows, seed))
+    college_df, _ = clean_missing_test_scores(college_df)
+    college_df = pd.get_dummies(college_df, columns=["admission_test"], dtype=int)
+
+    return college_df[FEATURE_COLUMNS + [TARGET_COLUMN]].reset_index(drop=True)
+
+def _fit_and_save(five_college_df):
+    x_train, x_test, y_train, y_test = train_test_split_data(five_college_df)
+    final_linear_regression_model_with_scaling(x_train, x_test, y_train, y_test)
+
+def _artifact_for(five_college_df):
+    features = five_college_df[FEATURE_COLUMNS].to_numpy(dtype=float)
+    scaler = StandardScaler().fit(features)
+    linear_regression = LinearRegression().fit(scaler.transform(features),
+                                               five_college_df[TARGET_COLUMN])
+
+    return build_artifact(linear_regression, scaler, FEATURE_COLUMNS), features
+
+# Stage name to (setup, stage); setup builds the stage's input for a scale and is not timed
+STAGES = {
+    "parse_profile_pages": (
+        lambda pages, _: pages,
+        lambda pages: [extract_college_fields(page, link) for link, page in pages]),
+    "clean_college_dataframe": (
+        lambda _, scale: synthetic_college_df(BASE_ROWS * scale),
+        lambda college_df: clean_college_dataframe(college_df.copy())),
+    "clean_missing_test_scores": (
+        lambda _, scale: clean_college_dataframe(synthetic_college_df(BASE_ROWS * scale)),
+        lambda college_df: clean_missing_test_scores(college_df.copy())),
+    "final_data_cleaning": (
+        lambda _, scale: clean_missing_test_scores(
+            clean_college_dataframe(synthetic_college_df(BASE_ROWS * scale)))[0],
+        lambda college_df: final_data_cleaning(college_df.copy())),
+    "cross_validation": (
+        lambda _, scale: synthetic_model_df(BASE_ROWS * scale),
+        lambda five_college_df: cross_validate_variants(
+            model_variants(), five_college_df[FEATURE_COLUMNS],
+            five_college_df[TARGET_COLUMN], n_jobs=1)),
+    "final_fit": (
+        lambda _, scale: synthetic_model_df(BASE_ROWS * scale),
+        _fit_and_save),
+    "streaming_fit": (
+        lambda _, scale: synthetic_model_df(BASE_ROWS * scale),
+        lambda five_college_df: streaming_linear_regression(
+            (five_college_df[start:start + 50_000]
+             for start in range(0, len(five_college_df), 50_000)),
+            FEATURE_COLUMNS, TARGET_COLUMN)),
+    "predict_batch": (
+        lambda _, scale: _artifact_for(synthetic_model_df(BASE_ROWS * scale)),
+        lambda inputs: predict_batch(*inputs)),
+}
+
+def measure(stage, stage_input, repeat):
+    '''
+    Returns the best wall time in seconds over repeat runs and the peak traced memory in MB
+    of one further run.
+    '''
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        stage(stage_input)
+        timings.append(time.perf_counter() - started)
+
+    tracemalloc.start()
+    stage(stage_input)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {"seconds": min(timings), "peak_mb": peak / 2**20}
+
+def run_benchmarks(scales, pages, repeat=3, stages=None):
+    '''
+    Runs every stage at every scale inside a temporary directory, since some stages write
+    their output files to the working directory.
+
+    Returns
+    -------
+    A dictionary of "stage@scale" to its seconds and peak_mb.
+    '''
+    results = {}
+    working_directory = os.getcwd()
+
+    with tempfile.TemporaryDirectory() as scratch, contextlib.redirect_stdout(io.StringIO()):
+        os.chdir(scratch)
+        try:
+            for name in stages or STAGES:
+                setup, stage = STAGES[name]
+                for scale in ([1] if name == "parse_profile_pages" else scales):
+                    results[f"{name}@{scale}x"] = measure(stage, setup(pages, scale), repeat)
+        finally:
+            os.chdir(working_directory)
+
+    return results
+
+def compare_to_baseline(results, baseline, time_tolerance, memory_tolerance):
+    '''
+    Returns a list of descriptions of the stages slower or larger than the baseline allows.
+    '''
+    regressions = []
+    for key, result in results.items():
+        if key not in baseline:
+            continue
+        if result["seconds"] > baseline[key]["seconds"] * time_tolerance:
+            regressions.append(f'{key}: {result["seconds"]:.4f} s vs '
+                               f'{baseline[key]["seconds"]:.4f} s baseline')
+        if result["peak_mb"] > baseline[key]["peak_mb"] * memory_tolerance:
+            regressions.append(f'{key}: {result["peak_mb"]:.1f} MB vs '
+                               f'{baseline[key]["peak_mb"]:.1f} MB baseline')
+
+    return regressions
+
+def main():
+    '''
+    Runs the benchmarks, prints a table of results and checks them against the baseline.
+    '''
+    parser = argparse.ArgumentParser(description="Benchmark the pipeline stages.")
+    parser.add_argument("--scales", default="1,10,100",
+                        help="Comma separated multiples of the current number of universities.")
+    parser.add_argument("--stages", help="Comma separated stages to run, all by default.")
+    parser.add_argument("--pages", help="A directory of saved profile pages to parse.")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--baseline", default=str(DEFAULT_BASELINE))
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--time-tolerance", type=float, default=1.25)
+    parser.add_argument("--memory-tolerance", type=float, default=1.10)
+    args = parser.parse_args()
+
+    if args.pages:
+        pages = [(path.stem, path.read_text())
+                 for path in sorted(Path(args.pages).glob("*.html"))]
+    else:
+        pages = [(str(seed), synthetic_profile_page(seed)) for seed in range(50)]
+
+    results = run_benchmarks([int(scale) for scale in args.scales.split(",")], pages,
+                             args.repeat, args.stages.split(",") if args.stages else None)
+
+    for key, result in results.items():
+        print(f'{key:<40} {result["seconds"] * 1000:>12.2f} ms {result["peak_mb"]:>10.1f} MB')
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as baseline_file:
+            json.dump(results, baseline_file, indent=2)
+        return
+
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as baseline_file:
+            regressions = compare_to_baseline(results, json.load(baseline_file),
+                                              args.time_tolerance, args.memory_tolerance)
+        for regression in regressions:
+            print(f'Regression: {regression}')
+        if regressions:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,5 @@
+'''
+Scrapes College Results Online, cleans the data and models five-year graduation rates of
+4-year public and private universities in the US. Run python -m graduation_rates --help for
+the command line interface.
+'''
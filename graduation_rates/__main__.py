@@ -0,0 +1,6 @@
+'''
+Runs the command line interface with python -m graduation_rates.
+'''
+from .cli import main
+
+main()
@@ -0,0 +1,166 @@
+'''
+This module cleans the dataframe of scraped universities: it drops unwanted rows, fills in
+missing GPA, test scores and part-time percents, adds dummy variables and saves the final
+dataset. Panels of many data years are cleaned one year at a time, skipping the years whose
+inputs did not change.
+'''
+import os
+
+import numpy as np
+import pandas as pd
+
+from .dataset_store import write_dataset
+from .imputation import apply_admission_rate_imputer, fit_admission_rate_imputer
+from .instrumentation import count, instrumented_stage
+from .panel_store import (CLEAN_PANEL, RAW_PANEL, fingerprint, is_stale, load_manifest,
+                          panel_years, read_panel, write_partition)
+
+EXCLUDED_SECTORS = ["Private for-profit", "-"]
+REQUIRED_COLUMNS = ['in_state_tuition', 'out_state_tuition', 'pell_percent', 'percent_admitted',
+                    'retention_rate', 'admission_test', 'four_year_grad_rate',
+                    'five_year_grad_rate', 'six_year_grad_rate']
+DUMMY_COLUMNS = ['sector', 'admission_test']
+
+# Every level of the dummy columns, sorted, the first of which is left out as a baseline
+DUMMY_LEVELS = {'sector': ['Private not-for-profit', 'Public'],
+                'admission_test': ['Accepts 100%', 'Considered but not required',
+                                   'Neither required nor recommended', 'Recommended', 'Required']}
+DUMMY_SCHEMA = [f"{column}_{level}" for column in DUMMY_COLUMNS
+                for level in DUMMY_LEVELS[column][1:]]
+
+@instrumented_stage()
+def clean_college_dataframe(college_df):
+    '''
+    This function cleans the college_df dataframe by removing duplicate columns, duplicate
+    rows, and dropping rows with NaN values in certain columns.
+
+    Parameters
+    ----------
+    college_df : The college dataframe.
+
+    Returns
+    -------
+    college_df : A cleaner version of college_df.
+    '''
+    rows_scraped = len(college_df)
+
+    # Convert ipeds_id column to float
+    college_df["ipeds_id"] = college_df["ipeds_id"].astype(float)
+
+    # Keep rows that are not for-profit (sector = - were all found to be for-profit) and have
+    # no missing values in the required columns
+    keep = (~college_df["sector"].isin(EXCLUDED_SECTORS)
+            & college_df[REQUIRED_COLUMNS].notna().all(axis=1))
+
+    # Select the kept rows without the college name column (duplicate column) in one copy
+    college_df = college_df.loc[keep.to_numpy(), college_df.columns != "college_name"]
+
+    count("rows_dropped", rows_scraped - len(college_df), stage="clean_college_dataframe",
+          rows_in=rows_scraped, rows_out=len(college_df))
+
+    return college_df
+
+@instrumented_stage()
+def clean_missing_test_scores(college_df, bin_edges=None, strategy="mean"):
+    '''
+    This function cleans the college_df dataframe by filling in missing values of the GPA,
+    SAT Reading, SAT Math, ACT and percent part-time columns with averages of universities
+    that admit a similar percent of applicants. percent_part_time is imputed rather than
+    required, so universities missing only that feature are kept.
+
+    Parameters
+    ----------
+    college_df : The college dataframe.
+    bin_edges : The bin edges of percent admitted, admitted at 20% or below, 21-40%, 41-60%,
+                61-80%, 81-99% and 100% by default.
+    strategy : Whether each bin is filled with its "mean" or "median".
+
+    Returns
+    -------
+    college_df : A cleaner version of college_df.
+    imputation_stats : The fitted bin statistics, to reuse on new data.
+    '''
+    imputation_stats = fit_admission_rate_imputer(college_df, bin_edges=bin_edges,
+                                                  strategy=strategy)
+    college_df = apply_admission_rate_imputer(college_df, imputation_stats)
+
+    return college_df, imputation_stats
+
+@instrumented_stage()
+def final_data_cleaning(college_df, path='five_college_df.parquet'):
+    '''
+    This function cleans the college_df dataframe by adding dummy variables and then drops
+    four- and six-year graduation rates. The final dataframe is saved as a Parquet file.
+
+    Parameters
+    ----------
+    college_df : The college dataframe.
+    path : The Parquet file the final dataframe is saved to, or None to not save it.
+
+    Returns
+    -------
+    five_college_df : A final cleaned version of the college dataframe with only five-year
+    graduation rates that has been saved to a Parquet file.
+    '''
+    # Columns kept as they are, without four- and six-year graduation rates
+    five_college_columns = {column: college_df[column] for column in college_df.columns
+                            if column not in DUMMY_COLUMNS + ['four_year_grad_rate',
+                                                              'six_year_grad_rate']}
+
+    # Create int8 dummy variables for the levels in the data, then reindex them to
+    # DUMMY_SCHEMA so that levels no university has are columns of 0
+    dummies = {}
+    for column in DUMMY_COLUMNS:
+        codes, levels = pd.factorize(college_df[column], sort=True)
+        for code, level in enumerate(levels):
+            dummies[f"{column}_{level}"] = (codes == code).astype(np.int8)
+    dummy_df = (pd.DataFrame(dummies, index=college_df.index)
+                .reindex(columns=DUMMY_SCHEMA, fill_value=0).astype(np.int8))
+    five_college_columns.update(dummy_df.items())
+
+    # Create a data frame with just 5 year graduation rate as predictor
+    five_college_df = pd.DataFrame(five_college_columns)
+
+    # Save dataframe to a Parquet file
+    if path is not None:
+        write_dataset(five_college_df, path)
+
+    return five_college_df
+
+@instrumented_stage()
+def clean_panel(panel, years=None, strategy="mean", partition_by_state=False):
+    '''
+    This function cleans the scraped data years of a panel directory into its clean panel.
+    A year is only cleaned again when its scraped universities or the cleaning options
+    changed, and its imputation statistics are stored with it.
+
+    Parameters
+    ----------
+    panel : The panel directory, holding the raw and clean panels.
+    years : The data years to clean, or None for every scraped year.
+    strategy : Whether missing test scores are filled with the "mean" or "median" of a bin.
+    partition_by_state : Whether the clean panel is split into one file per state.
+
+    Returns
+    -------
+    rebuilt_years : The data years that were cleaned.
+    '''
+    raw_root = os.path.join(panel, RAW_PANEL)
+    clean_root = os.path.join(panel, CLEAN_PANEL)
+    raw_manifest = load_manifest(raw_root)
+
+    rebuilt_years = []
+    for data_year in panel_years(raw_root, years):
+        input_fingerprint = fingerprint(raw_manifest[str(data_year)]["fingerprint"], strategy,
+                                        partition_by_state)
+        if not is_stale(clean_root, data_year, input_fingerprint):
+            continue
+
+        college_df = clean_college_dataframe(read_panel(raw_root, [data_year]))
+        college_df, imputation_stats = clean_missing_test_scores(college_df, strategy=strategy)
+        write_partition(final_data_cleaning(college_df, path=None), clean_root, data_year,
+                        input_fingerprint, partition_by_state,
+                        metadata={"imputation_stats": imputation_stats})
+        rebuilt_years.append(data_year)
+
+    return rebuilt_years
@@ -0,0 +1,569 @@
+'''
+This module is the command line interface of the pipeline.
+
+Usage: python -m graduation_rates <command> [options]
+
+Commands
+--------
+scrape : Scrape College Results Online into a dataframe of universities.
+reparse : Parse the archived pages of a scrape again without the network.
+clean : Clean the scraped dataframe into the modeling dataset.
+train : Fit the final model and save its artifact.
+predict : Predict graduation rates for universities given as JSON.
+cv : Cross-validate the linear, ridge and LASSO model variants.
+tournament : Select a model variant and alpha with successive halving.
+bootstrap : Estimate confidence intervals of the final model's R^2 and MSE.
+scenarios : Simulate what-if scenarios over all universities.
+peers : Find the most similar universities to given universities.
+serve : Serve predictions over HTTP.
+run : Run the scrape, clean and train stages whose inputs changed.
+
+Each command imports only the modules it needs, so that predict starts without loading
+pandas, scikit-learn or the scraping libraries.
+'''
+import argparse
+import json
+import os
+import sys
+import time
+
+def read_model_dataset(args, columns):
+    '''
+    Reads the columns of the final dataset, or of the chosen years and states of the clean
+    panel when a panel directory is given.
+    '''
+    if args.panel is None:
+        from .dataset_store import read_dataset
+        return read_dataset(args.dataset, columns=columns)
+
+    from .panel_store import CLEAN_PANEL, parse_years, read_panel
+    return read_panel(os.path.join(args.panel, CLEAN_PANEL), parse_years(args.years), columns,
+                      args.states.split(",") if args.states else None)
+
+def iter_model_dataset(args, columns):
+    '''
+    Reads the columns of the final dataset, or of the chosen years and states of the clean
+    panel, in batches of args.batch_rows rows.
+    '''
+    if args.panel is None:
+        from .dataset_store import iter_dataset
+        return iter_dataset(args.dataset, columns, args.batch_rows)
+
+    from .panel_store import CLEAN_PANEL, iter_panel, parse_years
+    return iter_panel(os.path.join(args.panel, CLEAN_PANEL), parse_years(args.years), columns,
+                      args.batch_rows, args.states.split(",") if args.states else None)
+
+def read_model_data(args):
+    '''
+    Returns the model features and target, with the engineered features of args.features
+    appended to the features when it is given.
+    '''
+    from .train import FEATURE_COLUMNS, TARGET_COLUMN, separate_features_and_target
+
+    if not args.features:
+        return separate_features_and_target(
+            read_model_dataset(args, FEATURE_COLUMNS + [TARGET_COLUMN]))
+
+    import pandas as pd
+
+    from .features import FeatureCache, engineer_features, load_feature_spec
+
+    spec = load_feature_spec(args.features)
+    sources = {column for feature in spec for column in feature["columns"]}
+    five_college_df = read_model_dataset(
+        args, FEATURE_COLUMNS + sorted(sources - set(FEATURE_COLUMNS)) + [TARGET_COLUMN])
+
+    features_df = engineer_features(five_college_df, spec, FeatureCache(args.feature_cache))
+    x_data = pd.concat([five_college_df[FEATURE_COLUMNS], features_df], axis=1)
+
+    return x_data, five_college_df[TARGET_COLUMN]
+
+def add_feature_arguments(command):
+    '''
+    Adds the options that append engineered features to the model features.
+    '''
+    command.add_argument("--features", metavar="SPEC",
+                         help='A JSON feature spec to add, or "default" for the test score '
+                              'and test requirement interactions.')
+    command.add_argument("--feature-cache", default="feature_cache")
+
+def add_panel_arguments(command, states=True):
+    '''
+    Adds the options that select data years, and optionally states, of a panel directory.
+    '''
+    command.add_argument("--panel", help="A panel directory of many data years.")
+    command.add_argument("--years", help='Data years of the panel, such as "2015-2024".')
+    if states:
+        command.add_argument("--states", help="Comma separated states of the panel.")
+
+def scraped_output(args):
+    '''
+    Returns the file a scrape is written to: args.output, or a scratch file in the raw panel
+    when a panel directory is given, so that import_scraped can move it into place.
+    '''
+    if args.panel is None:
+        return args.output
+
+    from .panel_store import RAW_PANEL
+
+    raw_root = os.path.join(args.panel, RAW_PANEL)
+    os.makedirs(raw_root, exist_ok=True)
+
+    return os.path.join(raw_root, ".scrape.parquet")
+
+def import_scraped(args, output, rows):
+    '''
+    Moves a scraped file into its data year of the raw panel if it changed, or deletes it.
+    '''
+    if args.panel is None:
+        return
+
+    from .panel_store import RAW_PANEL, fingerprint, import_partition, is_stale
+
+    raw_root = os.path.join(args.panel, RAW_PANEL)
+    input_fingerprint = fingerprint(output)
+    if is_stale(raw_root, args.data_year, input_fingerprint):
+        import_partition(output, raw_root, args.data_year, input_fingerprint, rows)
+    else:
+        os.remove(output)
+
+def scrape(args):
+    '''
+    Scrapes every university in the IPEDS ID csv and saves the merged dataframe.
+    '''
+    from .concurrent_scraper import BASE_URL
+    from .page_cache import PageCache
+    from .scrape import stream_college_results_online
+    from .scrape_journal import ScrapeJournal
+
+    output = scraped_output(args)
+    with PageCache(args.cache, offline=args.offline, archive=args.archive) as cache, \
+            ScrapeJournal(args.journal) as journal:
+        rows = stream_college_results_online(
+            output, args.ids_csv, max_workers=args.workers,
+            requests_per_second=args.requests_per_second, base_url=args.base_url or BASE_URL,
+            cache=cache, journal=journal, max_age_days=args.max_age_days)
+
+    import_scraped(args, output, rows)
+
+def reparse(args):
+    '''
+    Parses the pages archived by scrape --archive again, without the network, and saves the
+    merged dataframe.
+    '''
+    from .page_cache import PageCache
+    from .reparse import reparse_archive
+
+    if not os.path.exists(args.cache):
+        raise FileNotFoundError(f"No page archive at {args.cache}")
+
+    output = scraped_output(args)
+    with PageCache(args.cache, max_bytes=None, offline=True) as cache:
+        rows = reparse_archive(cache, output, args.ids_csv, args.n_jobs, args.chunk_pages)
+    print(f'Parsed {rows} universities from {args.cache}')
+
+    import_scraped(args, output, rows)
+
+def clean(args):
+    '''
+    Cleans the scraped dataframe, saving the final dataset and the imputation statistics.
+    '''
+    from .clean import (clean_college_dataframe, clean_missing_test_scores, clean_panel,
+                        final_data_cleaning)
+    from .dataset_store import read_dataset
+    from .imputation import save_imputation_stats
+    from .panel_store import parse_years
+
+    if args.panel is not None:
+        rebuilt_years = clean_panel(args.panel, parse_years(args.years), args.strategy,
+                                    args.partition_by_state)
+        print(f'Cleaned data years: {rebuilt_years or "none, all were up to date"}')
+        return
+
+    college_df = clean_college_dataframe(read_dataset(args.input))
+    college_df, imputation_stats = clean_missing_test_scores(college_df,
+                                                             strategy=args.strategy)
+    save_imputation_stats(imputation_stats, args.imputation_stats)
+    final_data_cleaning(college_df, args.output)
+
+def train(args):
+    '''
+    Fits the final Linear Regression model with standard scaling and saves its artifact.
+    '''
+    from .imputation import load_imputation_stats
+    from .panel_store import CLEAN_PANEL, panel_years, parse_years, year_metadata
+    from .train import (FEATURE_COLUMNS, TARGET_COLUMN,
+                        final_linear_regression_model_with_scaling, train_test_split_data)
+
+    if args.panel is not None:
+        # New universities are imputed with the statistics of the latest data year
+        clean_root = os.path.join(args.panel, CLEAN_PANEL)
+        latest_year = panel_years(clean_root, parse_years(args.years))[-1]
+        imputation_stats = year_metadata(clean_root, latest_year)["imputation_stats"]
+    else:
+        imputation_stats = (load_imputation_stats(args.imputation_stats)
+                            if os.path.exists(args.imputation_stats) else None)
+
+    if args.streaming:
+        from .streaming_train import streaming_linear_regression
+        streaming_linear_regression(iter_model_dataset(args, FEATURE_COLUMNS + [TARGET_COLUMN]),
+                                    FEATURE_COLUMNS, TARGET_COLUMN, imputation_stats,
+                                    args.artifact, random_state=args.seed)
+        return
+
+    five_college_df = read_model_dataset(args, FEATURE_COLUMNS + [TARGET_COLUMN])
+    x_train, x_test, y_train, y_test = train_test_split_data(five_college_df,
+                                                             random_state=args.seed)
+    final_linear_regression_model_with_scaling(x_train, x_test, y_train, y_test,
+                                               imputation_stats, args.artifact)
+
+def predict(args):
+    '''
+    Predicts graduation rates for a JSON object or list of objects read from a file or stdin.
+    '''
+    from .model_artifact import encode_features, load_artifact, predict_batch
+
+    with (open(args.input, encoding="utf-8") if args.input != "-" else sys.stdin) as input_file:
+        payload = json.load(input_file)
+    records = [payload] if isinstance(payload, dict) else payload
+
+    artifact = load_artifact(args.artifact)
+    predictions = predict_batch(artifact, encode_features(artifact, records))
+
+    json.dump(predictions.tolist(), sys.stdout)
+    print()
+
+def cv(args):
+    '''
+    Cross-validates the chosen model variants on the same folds and prints their results.
+    '''
+    from .models.cross_validation import (cross_validate_variants, make_folds,
+                                          model_variants, print_cv_results)
+
+    x_data, y_data = read_model_data(args)
+
+    variants = model_variants(args.alpha)
+    if args.variants:
+        variants = {name: variants[name] for name in args.variants.split(",")}
+
+    results = cross_validate_variants(variants, x_data, y_data,
+                                      make_folds(x_data, args.folds, args.seed), args.n_jobs)
+    for name, fold_results in results.items():
+        print_cv_results(f'{name} results', fold_results)
+
+def tournament(args):
+    '''
+    Runs a successive-halving tournament between the model variants over a range of alphas
+    and prints the leaderboard.
+    '''
+    import numpy as np
+
+    from .models.tournament import candidate_grid, successive_halving
+
+    x_data, y_data = read_model_data(args)
+
+    low, high, n_alphas = args.alphas.split(",")
+    candidates = candidate_grid(np.logspace(float(low), float(high), int(n_alphas)),
+                                args.families.split(","))
+    leaderboard = successive_halving(candidates, x_data, y_data, args.factor, args.folds,
+                                     args.min_rows, args.seed, args.n_jobs)
+
+    print(leaderboard.head(args.top).to_string(index=False))
+
+def bootstrap(args):
+    '''
+    Prints confidence intervals of the final model's R^2 and MSE over many resamples.
+    '''
+    from .models.bootstrap import (bootstrap_scores, confidence_intervals,
+                                   print_confidence_intervals)
+
+    x_data, y_data = read_model_data(args)
+
+    scores = bootstrap_scores(x_data, y_data, args.replicates, args.method, args.test_size,
+                              args.seed, n_jobs=args.n_jobs)
+    print_confidence_intervals(f'{args.replicates} {args.method} replicates',
+                               confidence_intervals(scores, args.confidence), args.confidence)
+
+def scenarios(args):
+    '''
+    Predicts what-if scenarios from a JSON file for every university and prints the mean
+    change in graduation rate of each scenario per group.
+    '''
+    from .model_artifact import encode_features, load_artifact
+    from .scenarios import run_scenarios, sector_labels
+
+    with open(args.scenarios, encoding="utf-8") as scenarios_file:
+        scenario_list = json.load(scenarios_file)
+
+    artifact = load_artifact(args.artifact)
+    college_df = read_model_dataset(args, None)
+
+    groups = {"state": lambda: college_df["state"].astype(str),
+              "sector": lambda: sector_labels(college_df),
+              "all": lambda: None}[args.by]()
+    results = run_scenarios(artifact, encode_features(artifact, college_df), scenario_list,
+                            groups)
+
+    if args.output:
+        results.to_csv(args.output, index=False)
+    else:
+        print(results.to_string(index=False))
+
+def peers(args):
+    '''
+    Prints the most similar universities to each IPEDS ID, first bringing the peer index
+    saved next to the model artifact up to date when the dataset changed.
+    '''
+    from .model_artifact import load_artifact
+    from .panel_store import CLEAN_PANEL, MANIFEST, fingerprint
+    from .peers import PeerIndex, load_peer_index, peer_index_path, save_peer_index
+
+    artifact = load_artifact(args.artifact)
+    index_path = args.index or peer_index_path(args.artifact)
+    index = load_peer_index(index_path) if os.path.exists(index_path) else None
+    if index is None or not index.matches(artifact):
+        index = PeerIndex(artifact)
+
+    # Only changed universities are re-indexed, and only when the dataset changed
+    source = (fingerprint(args.dataset) if args.panel is None
+              else fingerprint(os.path.join(args.panel, CLEAN_PANEL, MANIFEST), args.years))
+    if index.source_fingerprint != source:
+        n_added, n_replaced, n_removed = index.update(read_model_dataset(args, None))
+        index.source_fingerprint = source
+        save_peer_index(index, index_path)
+        print(f'Peer index updated: {n_added} added, {n_replaced} replaced, '
+              f'{n_removed} removed', file=sys.stderr)
+
+    peers_df = index.peers(args.ipeds_ids, args.k,
+                           args.peer_states.split(",") if args.peer_states else None,
+                           args.peer_sectors.split(",") if args.peer_sectors else None)
+
+    if args.output:
+        peers_df.to_csv(args.output, index=False)
+    else:
+        print(peers_df.to_string(index=False))
+
+def serve(args):
+    '''
+    Serves predictions over HTTP until interrupted.
+    '''
+    import asyncio
+
+    from .model_artifact import load_artifact
+    from .prediction_server import PredictionServer
+
+    artifact = load_artifact(args.artifact)
+    peer_index = None
+    if args.peer_index:
+        from .peers import load_peer_index
+        peer_index = load_peer_index(args.peer_index)
+        if not peer_index.matches(artifact):
+            raise ValueError(f"{args.peer_index} was built for a different model artifact")
+
+    server = PredictionServer(artifact, args.max_batch_size, args.max_wait_ms, peer_index)
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+def run(args):
+    '''
+    Runs the scrape, clean, train and cv stages, skipping those whose inputs, parameters and
+    code did not change since they last ran.
+    '''
+    from .pipeline import pipeline_stages, run_pipeline
+
+    stages = pipeline_stages(
+        {"ids_csv": args.ids_csv},
+        {"scrape": {"page_cache": args.cache, "base_url": args.base_url,
+                    "max_workers": args.workers,
+                    "requests_per_second": args.requests_per_second},
+         "impute": {"strategy": args.strategy},
+         "train": {"random_state": args.seed},
+         "cv": {"alpha": args.alpha, "n_splits": args.folds, "random_state": args.seed}},
+        args.pipeline_cache)
+
+    statuses = run_pipeline(stages, args.pipeline_cache, args.jobs,
+                            args.force.split(",") if args.force else ())
+    for name, status in statuses.items():
+        print(f'{name}: {status}')
+
+def build_parser():
+    '''
+    Returns the argument parser with one subparser per command.
+    '''
+    parser = argparse.ArgumentParser(prog="graduation_rates",
+                                     description="Predict university graduation rates.")
+    parser.add_argument("--instrument", metavar="SINK",
+                        help='Write JSON stage timings to this file, or "-" for stderr.')
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="Record the peak traced memory of each stage, with --instrument.")
+    parser.add_argument("--profile-dir",
+                        help="Write a cProfile dump per stage here, with --instrument.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    command = commands.add_parser("scrape", help=scrape.__doc__.strip())
+    command.add_argument("--ids-csv",
+                         default="Data/4-Year-Public-and-Private-Universities-and-IPEDS-IDs.csv")
+    command.add_argument("--output", default="college_df.parquet")
+    command.add_argument("--cache", default="page_cache.sqlite")
+    command.add_argument("--journal", default="scrape_journal.jsonl")
+    command.add_argument("--offline", action="store_true",
+                         help="Rebuild the dataframe from cached pages only.")
+    command.add_argument("--archive", action="store_true",
+                         help="Keep every page in the cache, with no size limit, for reparse. "
+                              "The cache stays an archive on later runs.")
+    command.add_argument("--max-age-days", type=float, default=30)
+    command.add_argument("--workers", type=int, default=8)
+    command.add_argument("--requests-per-second", type=float, default=5)
+    command.add_argument("--base-url", help="The URL IPEDS IDs are appended to.")
+    command.add_argument("--panel", help="Save into this panel directory instead of --output.")
+    command.add_argument("--data-year", type=int, default=time.localtime().tm_year)
+    command.set_defaults(handler=scrape)
+
+    command = commands.add_parser("reparse", help=reparse.__doc__.strip())
+    command.add_argument("--ids-csv",
+                         default="Data/4-Year-Public-and-Private-Universities-and-IPEDS-IDs.csv")
+    command.add_argument("--output", default="college_df.parquet")
+    command.add_argument("--cache", default="page_cache.sqlite")
+    command.add_argument("--n-jobs", type=int, default=-1)
+    command.add_argument("--chunk-pages", type=int, default=64,
+                         help="The number of pages sent to a worker process at a time.")
+    command.add_argument("--panel", help="Save into this panel directory instead of --output.")
+    command.add_argument("--data-year", type=int, default=time.localtime().tm_year)
+    command.set_defaults(handler=reparse)
+
+    command = commands.add_parser("clean", help=clean.__doc__.strip())
+    command.add_argument("--input", default="college_df.parquet")
+    command.add_argument("--output", default="five_college_df.parquet")
+    command.add_argument("--imputation-stats", default="imputation_stats.json")
+    command.add_argument("--strategy", choices=["mean", "median"], default="mean")
+    add_panel_arguments(command, states=False)
+    command.add_argument("--partition-by-state", action="store_true")
+    command.set_defaults(handler=clean)
+
+    command = commands.add_parser("train", help=train.__doc__.strip())
+    command.add_argument("--dataset", default="five_college_df.parquet")
+    command.add_argument("--imputation-stats", default="imputation_stats.json")
+    command.add_argument("--artifact", default="graduation_rate_model.json")
+    add_panel_arguments(command)
+    command.add_argument("--streaming", action="store_true",
+                         help="Train from batches of rows instead of loading the dataset.")
+    command.add_argument("--batch-rows", type=int, default=1_000_000)
+    command.add_argument("--seed", type=int, help="The seed of the train/test split.")
+    command.set_defaults(handler=train)
+
+    command = commands.add_parser("predict", help=predict.__doc__.strip())
+    command.add_argument("input", nargs="?", default="-",
+                         help="A JSON file of universities, stdin by default.")
+    command.add_argument("--artifact", default="graduation_rate_model.json")
+    command.set_defaults(handler=predict)
+
+    command = commands.add_parser("cv", help=cv.__doc__.strip())
+    command.add_argument("--dataset", default="five_college_df.parquet")
+    command.add_argument("--variants", help="Comma separated variants, all six by default.")
+    command.add_argument("--alpha", type=float, default=1.0)
+    command.add_argument("--folds", type=int, default=5)
+    command.add_argument("--seed", type=int)
+    command.add_argument("--n-jobs", type=int, default=-1)
+    add_panel_arguments(command)
+    add_feature_arguments(command)
+    command.set_defaults(handler=cv)
+
+    command = commands.add_parser("tournament", help=tournament.__doc__.strip())
+    command.add_argument("--dataset", default="five_college_df.parquet")
+    command.add_argument("--alphas", default="-3,3,50",
+                         help="Log10 of the smallest and largest alpha and the number of alphas.")
+    command.add_argument("--families", default="linear,ridge,lasso")
+    command.add_argument("--factor", type=int, default=3)
+    command.add_argument("--folds", type=int, default=5)
+    command.add_argument("--min-rows", type=int, default=100)
+    command.add_argument("--top", type=int, default=10, help="The leaderboard rows printed.")
+    command.add_argument("--seed", type=int)
+    command.add_argument("--n-jobs", type=int, default=-1)
+    add_panel_arguments(command)
+    add_feature_arguments(command)
+    command.set_defaults(handler=tournament)
+
+    command = commands.add_parser("bootstrap", help=bootstrap.__doc__.strip())
+    command.add_argument("--dataset", default="five_college_df.parquet")
+    command.add_argument("--replicates", type=int, default=2000)
+    command.add_argument("--method", choices=["bootstrap", "split"], default="bootstrap",
+                         help="Resample rows, or draw random 80/20 train and test splits.")
+    command.add_argument("--test-size", type=float, default=.2)
+    command.add_argument("--confidence", type=float, default=.95)
+    command.add_argument("--seed", type=int, default=0)
+    command.add_argument("--n-jobs", type=int, default=-1)
+    add_panel_arguments(command)
+    add_feature_arguments(command)
+    command.set_defaults(handler=bootstrap)
+
+    command = commands.add_parser("scenarios", help=scenarios.__doc__.strip())
+    command.add_argument("scenarios", help="A JSON file with a list of scenarios.")
+    command.add_argument("--dataset", default="five_college_df.parquet")
+    command.add_argument("--artifact", default="graduation_rate_model.json")
+    command.add_argument("--by", choices=["state", "sector", "all"], default="all",
+                         help="The groups the changes are averaged over.")
+    command.add_argument("--output", help="Write the results to this csv file.")
+    add_panel_arguments(command)
+    command.set_defaults(handler=scenarios)
+
+    command = commands.add_parser("peers", help=peers.__doc__.strip())
+    command.add_argument("ipeds_ids", nargs="+", type=int)
+    command.add_argument("--k", type=int, default=20, help="The number of peers of each.")
+    command.add_argument("--sectors", dest="peer_sectors",
+                         help='Comma separated sectors of the peers, e.g. "Public".')
+    command.add_argument("--dataset", default="five_college_df.parquet")
+    command.add_argument("--artifact", default="graduation_rate_model.json")
+    command.add_argument("--index", help="The peer index file, next to the artifact by default.")
+    command.add_argument("--output", help="Write the peers to this csv file.")
+    # The states filter the peers, while the whole panel is indexed
+    add_panel_arguments(command, states=False)
+    command.add_argument("--states", dest="peer_states",
+                         help="Comma separated states of the peers.")
+    command.set_defaults(handler=peers, states=None)
+
+    command = commands.add_parser("serve", help=serve.__doc__.strip())
+    command.add_argument("--artifact", default="graduation_rate_model.json")
+    command.add_argument("--host", default="127.0.0.1")
+    command.add_argument("--port", type=int, default=8080)
+    command.add_argument("--max-batch-size", type=int, default=4096)
+    command.add_argument("--max-wait-ms", type=float, default=1.0)
+    command.add_argument("--peer-index", help="A peer index to answer POST /peers from.")
+    command.set_defaults(handler=serve)
+
+    command = commands.add_parser("run", help=run.__doc__.strip())
+    command.add_argument("--ids-csv",
+                         default="Data/4-Year-Public-and-Private-Universities-and-IPEDS-IDs.csv")
+    command.add_argument("--cache", default="page_cache.sqlite")
+    command.add_argument("--workers", type=int, default=8)
+    command.add_argument("--requests-per-second", type=float, default=5)
+    command.add_argument("--base-url", help="The URL IPEDS IDs are appended to.")
+    command.add_argument("--strategy", choices=["mean", "median"], default="mean")
+    command.add_argument("--alpha", type=float, default=1.0)
+    command.add_argument("--folds", type=int, default=5)
+    command.add_argument("--seed", type=int, default=0,
+                         help="The seed of the train/test split and the folds.")
+    command.add_argument("--pipeline-cache", default="pipeline_cache",
+                         help="The directory of cached stage outputs and intermediate datasets.")
+    command.add_argument("--jobs", type=int, help="The most stages run at the same time.")
+    command.add_argument("--force", help="Comma separated stages to run even if cached.")
+    command.set_defaults(handler=run)
+
+    return parser
+
+def main(argv=None):
+    '''
+    Parses the command line and runs the chosen command.
+    '''
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    if (args.trace_memory or args.profile_dir) and not args.instrument:
+        parser.error("--trace-memory and --profile-dir require --instrument")
+
+    if args.instrument:
+        from .instrumentation import configure
+        configure(args.instrument, args.trace_memory, args.profile_dir)
+
+    args.handler(args)
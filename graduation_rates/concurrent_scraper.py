@@ -0,0 +1,218 @@
+'''
+This module fetches College Results Online profile pages concurrently. A thread pool shares
+one keep-alive requests session, requests to each host are rate limited, and failed requests
+are retried with exponential backoff. Results are yielded in order from a bounded window of
+in-flight pages.
+'''
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from .instrumentation import record_http
+from .page_cache import CacheMiss
+from .page_extractor import PARSE_ERRORS
+
+BASE_URL = "http://www.collegeresults.org/collegeprofile.aspx?institutionid="
+
+# Errors raised by a single page that should not stop the rest of the scrape
+PAGE_ERRORS = (*PARSE_ERRORS, requests.RequestException)
+
+class HostRateLimiter:
+    '''
+    Spaces out requests so that no host receives more than requests_per_second requests.
+    A requests_per_second of None turns rate limiting off.
+    '''
+    def __init__(self, requests_per_second=None):
+        self.min_interval = 1.0 / requests_per_second if requests_per_second else 0.0
+        self._lock = threading.Lock()
+        self._next_slot = {}
+
+    def wait(self, url):
+        '''
+        Blocks the calling thread until the host of url may be requested again.
+        '''
+        if not self.min_interval:
+            return
+
+        host = urlsplit(url).netloc
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self.min_interval
+
+        if slot > now:
+            time.sleep(slot - now)
+
+def build_session(pool_size=8, max_retries=3, backoff_factor=0.5):
+    '''
+    Creates a requests session whose connection pool holds pool_size keep-alive connections
+    per host and retries throttled or failed requests with exponential backoff.
+
+    Parameters
+    ----------
+    pool_size : The number of connections kept open per host.
+    max_retries : The number of times a failed request is retried.
+    backoff_factor : The base delay in seconds between retries, doubled after each attempt.
+
+    Returns
+    -------
+    A configured requests session.
+    '''
+    retry = Retry(total=max_retries, backoff_factor=backoff_factor,
+                  status_forcelist=(429, 500, 502, 503, 504),
+                  allowed_methods=frozenset(["GET"]), raise_on_status=False)
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+
+    return session
+
+def fetch_page(session, url, rate_limiter=None, timeout=30, cache=None, cache_key=None,
+               parse=None):
+    '''
+    Requests one page through the shared session, waiting on the rate limiter first.
+
+    When a cache is given, a fresh cached copy is used without a request, a stale copy is
+    revalidated with If-None-Match/If-Modified-Since, and downloaded pages are stored once
+    they parse. A cached copy that fails to parse is dropped and downloaded again. In offline
+    mode a page that is not cached raises CacheMiss.
+
+    Parameters
+    ----------
+    parse : A function of the page HTML raising one of PARSE_ERRORS for a page that should
+            not be cached, the HTML is returned unchanged by default.
+
+    Returns
+    -------
+    The page HTML passed through parse.
+    '''
+    parse = parse or (lambda page: page)
+    cached_page = cache.get(cache_key) if cache is not None else None
+    headers = {}
+
+    if cache is not None:
+        if cached_page is not None and (cache.offline or cache.is_fresh(cached_page)):
+            try:
+                return parse(cached_page.body)
+            except PARSE_ERRORS:
+                if cache.offline:
+                    raise
+                cache.delete(cache_key)
+                cached_page = None
+        if cache.offline:
+            raise CacheMiss(cache_key)
+        if cached_page is not None and cached_page.etag:
+            headers["If-None-Match"] = cached_page.etag
+        if cached_page is not None and cached_page.last_modified:
+            headers["If-Modified-Since"] = cached_page.last_modified
+
+    if rate_limiter is not None:
+        rate_limiter.wait(url)
+
+    started = time.perf_counter()
+    response = session.get(url, headers=headers, timeout=timeout)
+    record_http(time.perf_counter() - started, len(response.content), response.status_code)
+
+    if cache is not None and response.status_code == 304 and cached_page is not None:
+        try:
+            parsed = parse(cached_page.body)
+        except PARSE_ERRORS:
+            cache.delete(cache_key)
+            raise
+        cache.touch(cache_key)
+        return parsed
+
+    parsed = parse(response.text)
+    if cache is not None and response.ok:
+        cache.put(cache_key, response.text, response.headers.get("ETag"),
+                  response.headers.get("Last-Modified"))
+
+    return parsed
+
+def iter_scrape(links_to_follow, parse_page, base_url=BASE_URL, max_workers=8,
+                requests_per_second=None, max_retries=3, backoff_factor=0.5, timeout=30,
+                cache=None, journal=None, window=None, replay=None):
+    '''
+    Fetches and parses the page of every link on a thread pool, yielding results as they are
+    ready in the order of links_to_follow. At most window links are in flight at a time, so
+    memory does not grow with the number of links, which may be any iterable.
+
+    Parameters
+    ----------
+    links_to_follow : An iterable of unique parts of the links for the univerisities.
+    parse_page : A function taking the page HTML and the link and returning a dictionary.
+    base_url : The URL each link is appended to.
+    max_workers : The number of pages fetched at the same time.
+    requests_per_second : The maximum request rate per host, or None for no limit.
+    max_retries : The number of times a failed request is retried.
+    backoff_factor : The base delay in seconds between retries.
+    timeout : The number of seconds to wait for a response.
+    cache : An optional PageCache used to skip or revalidate downloads.
+    journal : An optional ScrapeJournal every parsed dictionary is appended to as soon as
+              it is ready.
+    window : The number of links submitted ahead of the one being yielded, four per worker
+             by default.
+    replay : An optional function returning a previously parsed dictionary for a link, such
+             as ScrapeJournal.replay, or None if the link must be scraped.
+
+    Returns
+    -------
+    A generator of (link, parsed dictionary) pairs. The dictionary is None for pages that
+    fail to download or parse, or are missing from the cache in offline mode.
+    '''
+    session = build_session(max_workers, max_retries, backoff_factor)
+    rate_limiter = HostRateLimiter(requests_per_second)
+    window = window or 4 * max_workers
+
+    def scrape_one(link):
+        college_dict = replay(link) if replay is not None else None
+        if college_dict is not None:
+            return college_dict
+
+        try:
+            college_dict = fetch_page(session, base_url + link, rate_limiter, timeout, cache,
+                                      link, lambda page: parse_page(page, link))
+        except (CacheMiss, *PAGE_ERRORS):
+            return None
+
+        if journal is not None:
+            journal.append(college_dict)
+
+        return college_dict
+
+    with session, ThreadPoolExecutor(max_workers=max_workers) as executor:
+        in_flight = deque()
+        for link in links_to_follow:
+            in_flight.append((link, executor.submit(scrape_one, link)))
+            if len(in_flight) >= window:
+                link, future = in_flight.popleft()
+                yield link, future.result()
+
+        while in_flight:
+            link, future = in_flight.popleft()
+            yield link, future.result()
+
+def scrape_concurrently(links_to_follow, parse_page, base_url=BASE_URL, max_workers=8,
+                        requests_per_second=None, max_retries=3, backoff_factor=0.5,
+                        timeout=30, cache=None, journal=None):
+    '''
+    Fetches and parses the page of every link on a thread pool, as iter_scrape does.
+
+    Returns
+    -------
+    A list of the parsed dictionaries in the same order as links_to_follow. Pages that fail
+    to download or parse, or are missing from the cache in offline mode, are skipped.
+    '''
+    results = iter_scrape(links_to_follow, parse_page, base_url, max_workers,
+                          requests_per_second, max_retries, backoff_factor, timeout, cache,
+                          journal)
+
+    return [college_dict for _, college_dict in results if college_dict is not None]
@@ -0,0 +1,195 @@
+'''
+This module stores the cleaned college dataframe as a versioned Parquet file. Columns are
+written with compact dtypes (float32 measures, int8 dummy variables, categorical state) and
+read back with column projection from a memory-mapped file, so loading only the model
+features touches a small part of the file. Files too large for memory are read in batches.
+'''
+import os
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+DATASET_VERSION = "1"
+
+# The ID and name columns of the universities, as named once the IPEDS ID csv is read
+ID_COLUMN = "ipeds_id"
+NAME_COLUMN = "Institution_name"
+
+DUMMY_PREFIXES = ("sector_", "admission_test_")
+CATEGORICAL_COLUMNS = ("state",)
+
+def normalize_id_columns(columns):
+    '''
+    Returns column names with the IPEDS ID column, IPEDS_ID in the csv and notebook pickles
+    of this repository, renamed to ID_COLUMN.
+    '''
+    return [ID_COLUMN if column.lower() == ID_COLUMN else column for column in columns]
+
+def compact_dtypes(college_df):
+    '''
+    Returns a copy of the college dataframe with the smallest dtypes that hold its values.
+
+    Parameters
+    ----------
+    college_df : The college dataframe.
+
+    Returns
+    -------
+    college_df : The college dataframe with float32 measures, int8 dummy variables, an int32
+    IPEDS ID and a categorical state.
+    '''
+    dtypes = {}
+    for column, dtype in college_df.dtypes.items():
+        if column.startswith(DUMMY_PREFIXES):
+            dtypes[column] = "int8"
+        elif column.lower() == ID_COLUMN:
+            dtypes[column] = "int32"
+        elif column in CATEGORICAL_COLUMNS:
+            dtypes[column] = "category"
+        elif pd.api.types.is_float_dtype(dtype):
+            dtypes[column] = "float32"
+
+    return college_df.astype(dtypes)
+
+def write_dataset(college_df, path):
+    '''
+    Writes the college dataframe to a Parquet file tagged with DATASET_VERSION.
+
+    Parameters
+    ----------
+    college_df : The college dataframe.
+    path : The Parquet file to write.
+    '''
+    table = pa.Table.from_pandas(compact_dtypes(college_df), preserve_index=False)
+    metadata = {**(table.schema.metadata or {}), b"dataset_version": DATASET_VERSION.encode()}
+
+    pq.write_table(table.replace_schema_metadata(metadata), path, compression="zstd")
+
+class DatasetWriter:
+    '''
+    Writes rows to a Parquet file tagged with DATASET_VERSION in batches of batch_rows, so
+    that only one batch is held in memory. Rows are dictionaries of column to value, with
+    the values of integer and dictionary columns given as strings, such as IPEDS IDs.
+    The rows go to path + ".tmp", which replaces path only once the writer is closed, so an
+    error part way through leaves no truncated file behind.
+
+    Parameters
+    ----------
+    path : The Parquet file to write.
+    schema : The pyarrow schema of the file.
+    batch_rows : The number of rows buffered before they are written.
+    '''
+    def __init__(self, path, schema, batch_rows=10_000):
+        self.schema = schema.with_metadata({b"dataset_version": DATASET_VERSION.encode()})
+        self.batch_rows = batch_rows
+        self.rows_written = 0
+        self._rows = []
+
+        # Integer and dictionary columns arrive as strings and are cast once per batch
+        self._source_schema = pa.schema([
+            (field.name, pa.string() if pa.types.is_integer(field.type)
+             or pa.types.is_dictionary(field.type) else field.type) for field in self.schema])
+        self.path = path
+        self._scratch = path + ".tmp"
+        self._writer = pq.ParquetWriter(self._scratch, self.schema, compression="zstd")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc_info):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def append(self, row):
+        '''
+        Adds one row, writing the buffered batch when it is full.
+        '''
+        self._rows.append(row)
+        if len(self._rows) >= self.batch_rows:
+            self.flush()
+
+    def flush(self):
+        '''
+        Writes the buffered rows as one row group.
+        '''
+        if not self._rows:
+            return
+
+        table = pa.Table.from_pylist(self._rows, schema=self._source_schema).cast(self.schema)
+        self._writer.write_table(table)
+
+        self.rows_written += len(self._rows)
+        self._rows = []
+
+    def close(self):
+        '''
+        Writes the remaining rows, closes the file and moves it to path.
+        '''
+        self.flush()
+        self._writer.close()
+        os.replace(self._scratch, self.path)
+
+    def abort(self):
+        '''
+        Closes and deletes the partly written file, leaving path as it was.
+        '''
+        self._writer.close()
+        os.remove(self._scratch)
+
+def read_dataset(path, columns=None):
+    '''
+    Reads a Parquet file written by write_dataset.
+
+    Parameters
+    ----------
+    path : The Parquet file to read.
+    columns : The columns to load, or None for all of them.
+
+    Returns
+    -------
+    college_df : The college dataframe with only the requested columns.
+    '''
+    table = pq.read_table(path, columns=columns, memory_map=True)
+    _check_version(path, table.schema)
+
+    return table.to_pandas()
+
+def iter_dataset(path, columns=None, batch_rows=1_000_000):
+    '''
+    Reads a Parquet file written by write_dataset in batches, so that only one batch of rows
+    is in memory at a time.
+
+    Parameters
+    ----------
+    path : The Parquet file to read.
+    columns : The columns to load, or None for all of them.
+    batch_rows : The largest number of rows in a batch.
+
+    Returns
+    -------
+    A generator of college dataframes with only the requested columns.
+    '''
+    parquet_file = pq.ParquetFile(path, memory_map=True)
+    _check_version(path, parquet_file.schema_arrow)
+
+    for batch in parquet_file.iter_batches(batch_size=batch_rows, columns=columns):
+        yield batch.to_pandas()
+
+def _check_version(path, schema):
+    version = (schema.metadata or {}).get(b"dataset_version", b"").decode()
+    if version != DATASET_VERSION:
+        raise ValueError(f"{path} has dataset version {version or 'none'}, "
+                         f"expected {DATASET_VERSION}")
+
+def convert_pickle(pickle_path, path):
+    '''
+    Converts a pickled college dataframe, such as the ones in Notebooks/, to a Parquet file,
+    renaming its IPEDS_ID column to ID_COLUMN.
+    '''
+    college_df = pd.read_pickle(pickle_path)
+    college_df.columns = normalize_id_columns(college_df.columns)
+
+    write_dataset(college_df, path)
@@ -0,0 +1,162 @@
+'''
+This module adds engineered features, such as the interaction between the median ACT score
+and whether a university requires test scores, to the final dataset. Features are described
+by a JSON-able spec, a list of dictionaries like
+
+    {"name": "act_and_test_required", "kind": "interaction",
+     "columns": ["median_act_composite", "admission_test_Required"]}
+
+with kind "interaction" (the product of the columns), "polynomial" (a column to a degree) or
+"log" (the log of a column plus an offset). Each engineered column is cached on disk under
+the hash of its spec entry and of the values of its source columns, so changing the spec or
+the data only recomputes the columns it affects, and whole feature matrices are memoized in
+memory by dataset and spec hash for model sweeps that ask for them repeatedly.
+'''
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from .instrumentation import count
+
+# The interaction terms between test scores and test requirements from the notebooks
+DEFAULT_FEATURE_SPEC = [
+    {"name": "act_and_test_required", "kind": "interaction",
+     "columns": ["median_act_composite", "admission_test_Required"]},
+    {"name": "math_sat_and_test_required", "kind": "interaction",
+     "columns": ["median_sat_math", "admission_test_Required"]},
+    {"name": "verbal_sat_and_test_required", "kind": "interaction",
+     "columns": ["median_sat_verbal", "admission_test_Required"]},
+]
+
+FEATURE_KINDS = ("interaction", "polynomial", "log")
+
+def load_feature_spec(path):
+    '''
+    Reads a feature spec from a JSON file, or returns DEFAULT_FEATURE_SPEC for "default".
+    '''
+    if path == "default":
+        return DEFAULT_FEATURE_SPEC
+
+    with open(path, encoding="utf-8") as spec_file:
+        return json.load(spec_file)
+
+def spec_hash(spec):
+    '''
+    Returns a SHA-256 hex digest of a feature spec or of one of its entries.
+    '''
+    return hashlib.sha256(json.dumps(spec, sort_keys=True).encode()).hexdigest()
+
+def column_hash(values):
+    '''
+    Returns a SHA-256 hex digest of the values of a column.
+    '''
+    return hashlib.sha256(pd.util.hash_pandas_object(pd.Series(values), index=False)
+                          .to_numpy().tobytes()).hexdigest()
+
+def build_feature(college_df, feature):
+    '''
+    Computes one engineered column from its spec entry.
+
+    Parameters
+    ----------
+    college_df : The final college dataframe.
+    feature : A spec entry with a name, kind, source columns and the options of its kind,
+              degree for "polynomial" and offset (default 0) for "log".
+
+    Returns
+    -------
+    A float64 array with one value per university.
+    '''
+    if feature["kind"] not in FEATURE_KINDS:
+        raise ValueError(f"Unknown feature kind for {feature['name']}: {feature['kind']}")
+    sources = [college_df[column].to_numpy(dtype=float) for column in feature["columns"]]
+
+    if feature["kind"] == "interaction":
+        return np.prod(sources, axis=0)
+    if feature["kind"] == "polynomial":
+        return sources[0] ** feature["degree"]
+
+    return np.log(sources[0] + feature.get("offset", 0))
+
+class FeatureCache:
+    '''
+    A directory of engineered columns saved as .npy files named by the hash of their spec
+    entry and source column values, with the feature matrices built during this run kept
+    in memory.
+
+    Parameters
+    ----------
+    path : The cache directory, created if it does not exist.
+    '''
+    def __init__(self, path="feature_cache"):
+        self.path = path
+        self.matrices = {}
+        os.makedirs(path, exist_ok=True)
+
+    def get(self, key):
+        '''
+        Returns the cached column of a key, memory-mapped, or None if it is not cached.
+        '''
+        path = os.path.join(self.path, f"{key}.npy")
+
+        return np.load(path, mmap_mode="r") if os.path.exists(path) else None
+
+    def put(self, key, values):
+        '''
+        Saves the column of a key, replacing the file in one rename.
+        '''
+        path = os.path.join(self.path, f"{key}.npy")
+        with open(path + ".tmp", "wb") as column_file:
+            np.save(column_file, values)
+        os.replace(path + ".tmp", path)
+
+def engineer_features(college_df, spec=None, cache=None):
+    '''
+    Returns the engineered features of a feature spec.
+
+    Parameters
+    ----------
+    college_df : The final college dataframe, with the source columns of the spec.
+    spec : A list of feature spec entries, DEFAULT_FEATURE_SPEC by default.
+    cache : An optional FeatureCache to reuse columns and matrices from.
+
+    Returns
+    -------
+    features_df : A dataframe of the engineered columns, on the index of college_df.
+    '''
+    spec = DEFAULT_FEATURE_SPEC if spec is None else spec
+    names = [feature["name"] for feature in spec]
+    if len(set(names)) != len(names):
+        raise ValueError(f"Duplicate feature names in spec: {names}")
+
+    # Only the source columns of the spec are hashed
+    sources = sorted({column for feature in spec for column in feature["columns"]})
+    source_hashes = {column: column_hash(college_df[column]) for column in sources}
+    matrix_key = (spec_hash(source_hashes), spec_hash(spec))
+
+    if cache is not None and matrix_key in cache.matrices:
+        count("feature_matrix_hits", 1, stage="engineer_features")
+        return cache.matrices[matrix_key].set_axis(college_df.index)
+
+    columns = {}
+    n_built = 0
+    for feature in spec:
+        key = spec_hash([feature, [source_hashes[column] for column in feature["columns"]]])
+        values = cache.get(key) if cache is not None else None
+        if values is None:
+            values = build_feature(college_df, feature)
+            n_built += 1
+            if cache is not None:
+                cache.put(key, values)
+        columns[feature["name"]] = np.asarray(values)
+
+    count("features_built", n_built, stage="engineer_features",
+          features_cached=len(spec) - n_built)
+    features_df = pd.DataFrame(columns, index=college_df.index)
+    if cache is not None:
+        cache.matrices[matrix_key] = features_df
+
+    return features_df
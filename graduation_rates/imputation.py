@@ -0,0 +1,94 @@
+'''
+This module fills in missing GPA, test score and part-time values with statistics of
+universities that admit a similar percent of applicants. percent_admitted is binned once, a
+statistic of every target column is computed per bin in one groupby, and only the target
+columns are filled. The fitted statistics are plain JSON so they can be saved and reused at
+inference time.
+'''
+import json
+
+import numpy as np
+import pandas as pd
+
+# percent_part_time is a model feature that cleaning does not require, so it is imputed too
+IMPUTED_COLUMNS = ["average_gpa", "median_sat_verbal", "median_sat_math", "median_act_composite",
+                   "percent_part_time"]
+
+# Admitted at 20% or below, 21-40%, 41-60%, 61-80%, 81-99% and 100%
+DEFAULT_BIN_EDGES = [-np.inf, 20, 40, 60, 80, float(np.nextafter(100, 0)), 100]
+
+def fit_admission_rate_imputer(college_df, columns=None, bin_edges=None, strategy="mean",
+                               bin_column="percent_admitted"):
+    '''
+    Computes the statistic used to fill each target column for every percent admitted bin.
+
+    Parameters
+    ----------
+    college_df : The college dataframe.
+    columns : The columns to fill, IMPUTED_COLUMNS by default.
+    bin_edges : The right-inclusive bin edges of percent admitted, DEFAULT_BIN_EDGES by default.
+    strategy : "mean" or "median".
+    bin_column : The column that is binned.
+
+    Returns
+    -------
+    imputation_stats : A dictionary holding the bins, the statistic of each column per bin,
+    and the statistic over all universities used for rows outside every bin or for empty bins.
+    '''
+    columns = list(columns or IMPUTED_COLUMNS)
+    bin_edges = list(bin_edges or DEFAULT_BIN_EDGES)
+    if strategy not in ("mean", "median"):
+        raise ValueError(f"Unknown imputation strategy: {strategy}")
+
+    bins = pd.cut(college_df[bin_column], bin_edges, labels=False)
+    fallback = college_df[columns].agg(strategy)
+
+    bin_values = (college_df[columns].groupby(bins).agg(strategy)
+                  .reindex(range(len(bin_edges) - 1))
+                  .fillna(fallback))
+
+    return {"bin_column": bin_column, "bin_edges": bin_edges, "strategy": strategy,
+            "columns": columns, "bin_values": bin_values.to_numpy().tolist(),
+            "fallback": fallback.tolist()}
+
+def apply_admission_rate_imputer(college_df, imputation_stats):
+    '''
+    Fills the missing values of the target columns with the statistic of each row's bin.
+
+    Parameters
+    ----------
+    college_df : The college dataframe.
+    imputation_stats : The dictionary returned by fit_admission_rate_imputer.
+
+    Returns
+    -------
+    college_df : The college dataframe with the target columns filled in.
+    '''
+    columns = imputation_stats["columns"]
+
+    # The last row of the lookup table holds the fallback for rows outside every bin
+    lookup = np.vstack([imputation_stats["bin_values"], imputation_stats["fallback"]])
+    bins = pd.cut(college_df[imputation_stats["bin_column"]], imputation_stats["bin_edges"],
+                  labels=False).to_numpy()
+    bins = np.where(np.isnan(bins), len(lookup) - 1, bins).astype(np.intp)
+
+    values = college_df[columns].to_numpy(dtype=float, copy=True)
+    missing = np.isnan(values)
+    values[missing] = lookup[bins][missing]
+    college_df[columns] = values
+
+    return college_df
+
+def save_imputation_stats(imputation_stats, path):
+    '''
+    Writes the fitted imputation statistics to a JSON file.
+    '''
+    with open(path, "w", encoding="utf-8") as stats_file:
+        json.dump(imputation_stats, stats_file, indent=2)
+
+def load_imputation_stats(path):
+    '''
+    Reads imputation statistics written by save_imputation_stats.
+    '''
+    with open(path, encoding="utf-8") as stats_file:
+        return json.load(stats_file)
@@ -0,0 +1,162 @@
+'''
+This module provides opt-in timing and counter instrumentation for the pipeline. Stages are
+wrapped with the stage() context manager or the instrumented_stage() decorator, and each
+emits one JSON record with its wall time and memory high-water mark. HTTP requests and row
+counts are recorded as counters. Nothing is recorded unless instrumentation is enabled,
+either with configure() or with these environment variables:
+
+GRAD_RATES_INSTRUMENT : A file to append JSON records to, or "-" for stderr.
+GRAD_RATES_TRACEMALLOC : Set to 1 to record the peak traced Python memory of each stage.
+GRAD_RATES_PROFILE : A directory to write a cProfile .prof file per stage to.
+'''
+import contextlib
+import cProfile
+import functools
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+
+import numpy as np
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+_config = {"sink": os.environ.get("GRAD_RATES_INSTRUMENT"),
+           "trace_memory": os.environ.get("GRAD_RATES_TRACEMALLOC") == "1",
+           "profile_dir": os.environ.get("GRAD_RATES_PROFILE")}
+_lock = threading.Lock()
+_http = {"latencies": [], "bytes": 0, "statuses": {}}
+_profiling = threading.local()
+
+def configure(sink=None, trace_memory=False, profile_dir=None):
+    '''
+    Enables instrumentation, or disables it when sink is None.
+
+    Parameters
+    ----------
+    sink : A file path to append JSON records to, or "-" for stderr.
+    trace_memory : Whether to record the peak traced Python memory of each stage.
+    profile_dir : A directory to write a cProfile .prof file per stage to, or None.
+    '''
+    _config.update(sink=sink, trace_memory=trace_memory, profile_dir=profile_dir)
+
+def enabled():
+    '''
+    Returns whether instrumentation is on.
+    '''
+    return bool(_config["sink"])
+
+def emit(record):
+    '''
+    Writes one JSON record to the sink, stamped with the time.
+    '''
+    if not enabled():
+        return
+
+    line = json.dumps({"time": time.time(), **record}, default=float)
+    with _lock:
+        if _config["sink"] == "-":
+            print(line, file=sys.stderr)
+        else:
+            with open(_config["sink"], "a", encoding="utf-8") as sink_file:
+                sink_file.write(line + "\n")
+
+def count(name, value, **fields):
+    '''
+    Emits a counter record, e.g. the number of rows a stage dropped.
+    '''
+    emit({"type": "counter", "name": name, "value": value, **fields})
+
+def _max_rss_mb():
+    if resource is None:
+        return None
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    divisor = 2**20 if sys.platform == "darwin" else 2**10
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / divisor
+
+@contextlib.contextmanager
+def stage(name, **fields):
+    '''
+    Times the enclosed block and emits a stage record with its wall time, the process's
+    maximum resident memory and, when enabled, its peak traced memory and a cProfile dump.
+    '''
+    if not enabled():
+        yield
+        return
+
+    trace_memory = _config["trace_memory"] and not tracemalloc.is_tracing()
+    if trace_memory:
+        tracemalloc.start()
+    # Only one profiler can be active, so nested stages are profiled as part of the outer one
+    profiler = (cProfile.Profile()
+                if _config["profile_dir"] and not getattr(_profiling, "active", False) else None)
+    if profiler is not None:
+        profiler.enable()
+        _profiling.active = True
+
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record = {"type": "stage", "name": name, "seconds": time.perf_counter() - started,
+                  "max_rss_mb": _max_rss_mb(), **fields}
+
+        if profiler is not None:
+            profiler.disable()
+            _profiling.active = False
+            os.makedirs(_config["profile_dir"], exist_ok=True)
+            profile_path = os.path.join(_config["profile_dir"], f"{name}.prof")
+            profiler.dump_stats(profile_path)
+            record["profile"] = profile_path
+        if trace_memory:
+            record["peak_traced_mb"] = tracemalloc.get_traced_memory()[1] / 2**20
+            tracemalloc.stop()
+
+        emit(record)
+
+def instrumented_stage(name=None):
+    '''
+    A decorator that runs the function inside stage(), named after the function by default.
+    '''
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with stage(name or function.__name__):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def record_http(seconds, n_bytes, status_code):
+    '''
+    Records the latency, size and status of one HTTP response for http_summary().
+    '''
+    if not enabled():
+        return
+
+    with _lock:
+        _http["latencies"].append(seconds)
+        _http["bytes"] += n_bytes
+        _http["statuses"][status_code] = _http["statuses"].get(status_code, 0) + 1
+
+def http_summary():
+    '''
+    Emits the latency distribution, bytes downloaded and status counts of the HTTP
+    responses recorded since the last summary, then resets them.
+    '''
+    with _lock:
+        latencies, n_bytes, statuses = _http["latencies"], _http["bytes"], _http["statuses"]
+        _http.update(latencies=[], bytes=0, statuses={})
+
+    if not latencies:
+        return
+
+    p50, p90, p99 = np.percentile(np.array(latencies) * 1000, [50, 90, 99])
+    emit({"type": "http", "requests": len(latencies), "bytes": n_bytes,
+          "statuses": {str(status): total for status, total in statuses.items()},
+          "latency_p50_ms": p50, "latency_p90_ms": p90, "latency_p99_ms": p99,
+          "latency_max_ms": max(latencies) * 1000})
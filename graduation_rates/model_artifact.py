@@ -0,0 +1,164 @@
+'''
+This module bundles everything needed to predict graduation rates into one versioned JSON
+artifact: the feature columns, the dummy-encoding schema, the imputation statistics and the
+linear model with its standard scaling folded into the coefficients. Predictions are a single
+NumPy matrix product with no pandas or scikit-learn involved.
+'''
+import json
+
+import numpy as np
+
+ARTIFACT_VERSION = 1
+
+CATEGORICAL_COLUMNS = ("sector", "admission_test")
+
+def dummy_schema(feature_columns, categorical_columns=CATEGORICAL_COLUMNS):
+    '''
+    Returns a dictionary of dummy variable column to its (categorical column, level), e.g.
+    "admission_test_Required" to ("admission_test", "Required").
+    '''
+    return {column: (source, column[len(source) + 1:])
+            for column in feature_columns for source in categorical_columns
+            if column.startswith(source + "_")}
+
+def build_artifact(linear_regression, scaler, feature_columns, imputation_stats=None):
+    '''
+    Folds a fitted StandardScaler into the coefficients of a fitted LinearRegression and
+    bundles them with the preprocessing needed to score raw data.
+
+    Parameters
+    ----------
+    linear_regression : A LinearRegression fitted on scaled features.
+    scaler : The StandardScaler fitted on the training features.
+    feature_columns : The names of the features in model order.
+    imputation_stats : The statistics from fit_admission_rate_imputer, or None.
+
+    Returns
+    -------
+    artifact : A dictionary holding the model and its preprocessing.
+    '''
+    scale = np.where(scaler.scale_ == 0, 1.0, scaler.scale_)
+    coef = linear_regression.coef_ / scale
+    intercept = linear_regression.intercept_ - scaler.mean_ @ coef
+
+    return {"version": ARTIFACT_VERSION,
+            "feature_columns": list(feature_columns),
+            "dummy_schema": dummy_schema(feature_columns),
+            "imputation_stats": imputation_stats,
+            "scaler_mean": np.asarray(scaler.mean_, dtype=float),
+            "scaler_scale": np.asarray(scale, dtype=float),
+            "coef": np.asarray(coef, dtype=float),
+            "intercept": float(intercept)}
+
+def save_artifact(artifact, path):
+    '''
+    Writes an artifact to a JSON file.
+    '''
+    serializable = {key: value.tolist() if isinstance(value, np.ndarray) else value
+                    for key, value in artifact.items()}
+
+    with open(path, "w", encoding="utf-8") as artifact_file:
+        json.dump(serializable, artifact_file, indent=2)
+
+def load_artifact(path):
+    '''
+    Reads an artifact written by save_artifact, checking its version.
+    '''
+    with open(path, encoding="utf-8") as artifact_file:
+        artifact = json.load(artifact_file)
+
+    if artifact.get("version") != ARTIFACT_VERSION:
+        raise ValueError(f"{path} has artifact version {artifact.get('version')}, "
+                         f"expected {ARTIFACT_VERSION}")
+
+    for key in ("scaler_mean", "scaler_scale", "coef"):
+        artifact[key] = np.asarray(artifact[key], dtype=float)
+    artifact["dummy_schema"] = {column: tuple(level)
+                                for column, level in artifact["dummy_schema"].items()}
+
+    return artifact
+
+def _impute(artifact, features):
+    '''
+    Fills missing values of the imputed feature columns in place with the statistic of each
+    row's percent admitted bin.
+    '''
+    stats = artifact["imputation_stats"]
+    columns = artifact["feature_columns"]
+    if stats is None or stats["bin_column"] not in columns:
+        return
+
+    lookup = np.vstack([stats["bin_values"], stats["fallback"]])
+    edges = np.asarray(stats["bin_edges"], dtype=float)
+
+    # Bins are right-inclusive, as with pd.cut
+    bins = np.searchsorted(edges, features[:, columns.index(stats["bin_column"])]) - 1
+    bins[(bins < 0) | (bins >= len(edges) - 1)] = len(lookup) - 1
+
+    for stat_index, column in enumerate(stats["columns"]):
+        if column in columns:
+            values = features[:, columns.index(column)]
+            missing = np.isnan(values)
+            values[missing] = lookup[bins[missing], stat_index]
+
+def encode_features(artifact, records):
+    '''
+    Builds the feature matrix of the model from raw data.
+
+    Parameters
+    ----------
+    artifact : The model artifact.
+    records : Either a mapping of column name to values, such as a dataframe, or a list of
+              dictionaries with one university each. Dummy variables may be given directly
+              or as their categorical column, and missing imputed values may be None.
+
+    Returns
+    -------
+    features : A float64 array of shape (n_universities, n_features).
+    '''
+    columns = artifact["feature_columns"]
+    schema = artifact["dummy_schema"]
+    stats = artifact["imputation_stats"]
+
+    if not hasattr(records, "keys"):
+        if not records:
+            return np.empty((0, len(columns)))
+        names = set(columns) | {source for source, _ in schema.values()}
+        records = {name: [record.get(name) for record in records] for name in names
+                   if any(name in record for record in records)}
+
+    imputed = set(stats["columns"]) if stats else set()
+    first_column = next(iter(records.keys()), None)
+    n_rows = len(records[first_column]) if first_column is not None else 0
+    features = np.empty((n_rows, len(columns)))
+
+    for index, column in enumerate(columns):
+        if column in records:
+            features[:, index] = np.asarray(records[column], dtype=float)
+        elif column in schema and schema[column][0] in records:
+            source, level = schema[column]
+            features[:, index] = np.asarray(records[source], dtype=object) == level
+        elif column in imputed:
+            features[:, index] = np.nan
+        else:
+            raise ValueError(f"Missing feature column: {column}")
+
+    _impute(artifact, features)
+
+    return features
+
+def predict_batch(artifact, features):
+    '''
+    Predicts five-year graduation rates for a feature matrix in one matrix product.
+
+    Parameters
+    ----------
+    artifact : The model artifact.
+    features : An array of shape (..., n_features) in the order of feature_columns, such as
+               the output of encode_features.
+
+    Returns
+    -------
+    An array of predicted graduation rates of shape (...).
+    '''
+    return np.asarray(features, dtype=float) @ artifact["coef"] + artifact["intercept"]
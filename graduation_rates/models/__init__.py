@@ -0,0 +1,3 @@
+'''
+Cross-validation of the linear, ridge and LASSO regression models.
+'''
@@ -0,0 +1,151 @@
+'''
+This script sweeps the regularization strength of the Ridge and LASSO models along a whole
+path of alphas per fold instead of refitting each alpha from scratch. Ridge reuses a single
+SVD of each training fold for every alpha, and LASSO runs warm-started coordinate descent
+from the largest alpha down. Both return a fold x alpha grid of metrics.
+'''
+import numpy as np
+from joblib import Parallel, delayed
+from sklearn.linear_model import lasso_path
+
+from .cross_validation import make_folds
+
+def _center_fold(x_data, y_data, train_ind, val_ind, scale):
+    '''
+    Splits one fold and centers it on the training means, dividing by the training standard
+    deviations when scale is set, as Ridge, Lasso and StandardScaler do.
+    '''
+    x_train, y_train = x_data[train_ind], y_data[train_ind]
+    x_val, y_val = x_data[val_ind], y_data[val_ind]
+
+    x_mean, y_mean = x_train.mean(axis=0), y_train.mean()
+    x_scale = x_train.std(axis=0) if scale else np.ones(x_train.shape[1])
+    x_scale[x_scale == 0] = 1.0
+
+    return ((x_train - x_mean) / x_scale, y_train - y_mean,
+            (x_val - x_mean) / x_scale, y_val - y_mean)
+
+def _score_path(coefs, x_train, y_train, x_val, y_val):
+    '''
+    Scores a (n_alphas, n_features) array of coefficients on centered data. The intercept is
+    the training mean of the target, which centering has already removed.
+    '''
+    train_residuals = y_train[:, None] - x_train @ coefs.T
+    val_residuals = y_val[:, None] - x_val @ coefs.T
+
+    val_total = ((y_val - y_val.mean()) ** 2).sum()
+    mse = (val_residuals ** 2).mean(axis=0)
+
+    return {"r2_train": 1 - (train_residuals ** 2).sum(axis=0) / (y_train ** 2).sum(),
+            "r2_val": 1 - mse * len(y_val) / val_total,
+            "mse": mse}
+
+def ridge_fold_path(x_data, y_data, train_ind, val_ind, alphas, scale):
+    '''
+    Fits every alpha of one fold from a single SVD of the training features. An alpha of 0
+    gives the least squares fit of Linear Regression, even on a rank-deficient fold.
+
+    Parameters
+    ----------
+    x_data : Feature training and validation set.
+    y_data : Target training and validation set.
+    train_ind : The training rows of the fold.
+    val_ind : The validation rows of the fold.
+    alphas : An array of regularization strengths.
+    scale : Whether features are standard scaled on the training rows.
+
+    Returns
+    -------
+    A dictionary of the r2_train, r2_val and mse arrays, one value per alpha.
+    '''
+    x_train, y_train, x_val, y_val = _center_fold(x_data, y_data, train_ind, val_ind, scale)
+
+    u_matrix, singular_values, vt_matrix = np.linalg.svd(x_train, full_matrices=False)
+
+    # Singular values below the cutoff of np.linalg.lstsq are dropped, as the pseudo-inverse
+    # does, instead of dividing by them when alpha is 0
+    cutoff = np.finfo(float).eps * max(x_train.shape) * singular_values.max(initial=0)
+    denominators = singular_values ** 2 + alphas[:, None]
+    shrinkage = np.divide(singular_values, denominators, out=np.zeros_like(denominators),
+                          where=singular_values > cutoff)
+    coefs = (shrinkage * (u_matrix.T @ y_train)) @ vt_matrix
+
+    return _score_path(coefs, x_train, y_train, x_val, y_val)
+
+def lasso_fold_path(x_data, y_data, train_ind, val_ind, alphas, scale):
+    '''
+    Fits every alpha of one fold with coordinate descent, warm-starting each alpha from the
+    solution of the next larger one. Takes and returns the same as ridge_fold_path.
+    '''
+    x_train, y_train, x_val, y_val = _center_fold(x_data, y_data, train_ind, val_ind, scale)
+
+    order = np.argsort(alphas)[::-1]
+    _, path_coefs, _ = lasso_path(x_train, y_train, alphas=alphas[order])
+
+    coefs = np.empty((len(alphas), x_train.shape[1]))
+    coefs[order] = path_coefs.T
+
+    return _score_path(coefs, x_train, y_train, x_val, y_val)
+
+def _alpha_sweep(fold_path, x_data, y_data, alphas, scale, folds, n_jobs):
+    '''
+    Runs one path function over every fold in parallel and stacks the fold x alpha grids.
+    '''
+    x_data = np.asarray(x_data, dtype=float)
+    y_data = np.asarray(y_data, dtype=float)
+    alphas = np.asarray(alphas, dtype=float)
+    folds = folds if folds is not None else make_folds(x_data)
+
+    fold_scores = Parallel(n_jobs=n_jobs)(
+        delayed(fold_path)(x_data, y_data, train_ind, val_ind, alphas, scale)
+        for train_ind, val_ind in folds)
+
+    grid = {metric: np.vstack([scores[metric] for scores in fold_scores])
+            for metric in ("r2_train", "r2_val", "mse")}
+    grid["alphas"] = alphas
+
+    return grid
+
+def ridge_alpha_sweep(x_data, y_data, alphas, scale=False, folds=None, n_jobs=-1):
+    '''
+    Cross-validates a Ridge model for every alpha.
+
+    Parameters
+    ----------
+    x_data : Feature training and validation set.
+    y_data : Target training and validation set.
+    alphas : The regularization strengths to try.
+    scale : Whether features are standard scaled on each training fold.
+    folds : Precomputed (train_ind, val_ind) pairs, five shuffled folds by default.
+    n_jobs : The number of worker processes, -1 for one per core.
+
+    Returns
+    -------
+    A dictionary of alphas and the fold x alpha arrays r2_train, r2_val and mse.
+    '''
+    return _alpha_sweep(ridge_fold_path, x_data, y_data, alphas, scale, folds, n_jobs)
+
+def lasso_alpha_sweep(x_data, y_data, alphas, scale=False, folds=None, n_jobs=-1):
+    '''
+    Cross-validates a LASSO model for every alpha.
+
+    Parameters
+    ----------
+    x_data : Feature training and validation set.
+    y_data : Target training and validation set.
+    alphas : The regularization strengths to try.
+    scale : Whether features are standard scaled on each training fold.
+    folds : Precomputed (train_ind, val_ind) pairs, five shuffled folds by default.
+    n_jobs : The number of worker processes, -1 for one per core.
+
+    Returns
+    -------
+    A dictionary of alphas and the fold x alpha arrays r2_train, r2_val and mse.
+    '''
+    return _alpha_sweep(lasso_fold_path, x_data, y_data, alphas, scale, folds, n_jobs)
+
+def best_alpha(grid):
+    '''
+    Returns the alpha with the lowest mean validation MSE across folds.
+    '''
+    return grid["alphas"][np.argmin(grid["mse"].mean(axis=0))]
@@ -0,0 +1,150 @@
+'''
+This script estimates confidence intervals for the R^2 and MSE of the final Linear Regression
+model. Every replicate is a row weight matrix: resample counts for the bootstrap, with the
+out-of-bag rows held out, or 0/1 train and test masks for repeated 80/20 splits. A block of
+replicates is drawn up front and all of its models are fit and scored at once with batched
+NumPy normal equations. Blocks run in parallel with joblib, each seeded from its own child of
+one SeedSequence, so the results depend on the seed but not on the number of workers.
+'''
+import numpy as np
+from joblib import Parallel, delayed
+
+METRICS = ("r2_train", "r2_test", "mse")
+
+def resample_weights(n_rows, n_replicates, rng, method="bootstrap", test_size=.2):
+    '''
+    Draws the training weights and test masks of a block of replicates.
+
+    Parameters
+    ----------
+    n_rows : The number of rows in the data.
+    n_replicates : The number of replicates to draw.
+    rng : A NumPy Generator.
+    method : "bootstrap" to resample rows with replacement and test on the out-of-bag rows,
+             or "split" for random train and test splits.
+    test_size : The share of rows held out by "split".
+
+    Returns
+    -------
+    train_weights, test_mask : (n_replicates, n_rows) arrays of how many times each row is
+    in the training set and of whether it is in the test set.
+    '''
+    if method == "bootstrap":
+        # Count the draws of every row in one bincount, offsetting each replicate's indices
+        indices = rng.integers(0, n_rows, size=(n_replicates, n_rows))
+        indices += np.arange(n_replicates)[:, None] * n_rows
+        train_weights = np.bincount(indices.ravel(), minlength=n_replicates * n_rows)
+        train_weights = train_weights.reshape(n_replicates, n_rows)
+        return train_weights.astype(float), train_weights == 0
+
+    if method == "split":
+        n_test = int(np.ceil(n_rows * test_size))
+        test_mask = rng.permuted(np.tile(np.arange(n_rows) < n_test, (n_replicates, 1)),
+                                 axis=1)
+        return (~test_mask).astype(float), test_mask
+
+    raise ValueError(f"Unknown resampling method: {method}")
+
+def score_replicates(x_data, y_data, train_weights, test_mask):
+    '''
+    Fits one Linear Regression per replicate on its weighted training rows and scores it.
+    Standard scaling does not change the predictions of Linear Regression, so the scores are
+    those of the scaled final model.
+
+    Returns
+    -------
+    A dictionary of metric name to an array with one value per replicate.
+    '''
+    n_weights = train_weights.sum(axis=1)
+    x_mean = train_weights @ x_data / n_weights[:, None]
+    y_mean = train_weights @ y_data / n_weights
+
+    # Weighted Gram matrices and cross products of every replicate, centered on its means
+    x_centered = x_data[None, :, :] - x_mean[:, None, :]
+    y_centered = y_data[None, :] - y_mean[:, None]
+    x_weighted = (x_centered * train_weights[:, :, None]).transpose(0, 2, 1)
+    gram = x_weighted @ x_centered
+    cross = (x_weighted @ y_centered[:, :, None])[:, :, 0]
+
+    # Solve on the scaled Gram matrices, which is better conditioned
+    x_std = np.sqrt(np.diagonal(gram, axis1=1, axis2=2) / n_weights[:, None])
+    x_std[x_std == 0] = 1.0
+    scaled_gram = gram / (x_std[:, :, None] * x_std[:, None, :])
+    coef = (np.linalg.pinv(scaled_gram) @ (cross / x_std)[:, :, None])[:, :, 0] / x_std
+
+    residuals = y_centered - np.einsum("bnp,bp->bn", x_centered, coef)
+    squared = residuals ** 2
+
+    n_test = test_mask.sum(axis=1)
+    y_test_mean = (test_mask @ y_data) / n_test
+    test_total = (test_mask * (y_data[None, :] - y_test_mean[:, None]) ** 2).sum(axis=1)
+    test_sse = (test_mask * squared).sum(axis=1)
+
+    return {"r2_train": 1 - ((train_weights * squared).sum(axis=1)
+                             / (train_weights * y_centered ** 2).sum(axis=1)),
+            "r2_test": 1 - test_sse / test_total,
+            "mse": test_sse / n_test}
+
+def _score_block(x_data, y_data, seed, n_replicates, method, test_size):
+    '''
+    Draws and scores one block of replicates.
+    '''
+    train_weights, test_mask = resample_weights(len(y_data), n_replicates,
+                                                np.random.default_rng(seed), method, test_size)
+
+    return score_replicates(x_data, y_data, train_weights, test_mask)
+
+def bootstrap_scores(x_data, y_data, n_replicates=2000, method="bootstrap", test_size=.2,
+                     random_state=0, block_size=100, n_jobs=-1):
+    '''
+    Scores the final model over many resamples of the data.
+
+    Parameters
+    ----------
+    x_data : Features.
+    y_data : Target.
+    n_replicates : The number of resamples.
+    method : "bootstrap" or "split", as in resample_weights.
+    test_size : The share of rows held out by "split".
+    random_state : The seed all blocks of replicates are derived from.
+    block_size : The number of replicates drawn and scored together.
+    n_jobs : The number of worker processes, -1 for one per core.
+
+    Returns
+    -------
+    A dictionary of metric name to an array with one value per replicate.
+    '''
+    x_data = np.asarray(x_data, dtype=float)
+    y_data = np.asarray(y_data, dtype=float)
+
+    block_sizes = [min(block_size, n_replicates - start)
+                   for start in range(0, n_replicates, block_size)]
+    seeds = np.random.SeedSequence(random_state).spawn(len(block_sizes))
+
+    blocks = Parallel(n_jobs=n_jobs)(
+        delayed(_score_block)(x_data, y_data, seed, size, method, test_size)
+        for seed, size in zip(seeds, block_sizes))
+
+    return {metric: np.concatenate([block[metric] for block in blocks]) for metric in METRICS}
+
+def confidence_intervals(scores, confidence=.95):
+    '''
+    Returns a dictionary of metric name to its mean and percentile confidence interval.
+    '''
+    tail = (1 - confidence) / 2 * 100
+
+    return {metric: (values.mean(), *np.percentile(values, [tail, 100 - tail]))
+            for metric, values in scores.items()}
+
+def print_confidence_intervals(title, intervals, confidence=.95):
+    '''
+    Prints the mean and confidence interval of the train and test R^2 and the test Mean
+    Square Error.
+    '''
+    lines = [f'{title}:']
+    for label, metric in (("R^2 Train", "r2_train"), ("R^2 Test", "r2_test"),
+                          ("MSE", "mse")):
+        mean, low, high = intervals[metric]
+        lines.append(f'{label}: {mean} ({confidence:.0%} CI {low} to {high}),')
+
+    print("\n".join(lines))
@@ -0,0 +1,111 @@
+'''
+This script holds the cross-validation engine shared by the models in this folder. Any
+estimator, optionally wrapped with StandardScaler, is fit on precomputed k-fold index arrays
+over NumPy copies of the data, and folds of one or many models run in parallel with joblib.
+'''
+import numpy as np
+from joblib import Parallel, delayed
+from sklearn.base import clone
+from sklearn.linear_model import Lasso, LinearRegression, Ridge
+from sklearn.metrics import mean_squared_error
+from sklearn.model_selection import KFold
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler
+
+def make_folds(x_data, n_splits=5, random_state=None):
+    '''
+    Returns a list of (train_ind, val_ind) index arrays for shuffled k-fold cross-validation.
+    Computing them once lets every model be scored on the same folds.
+    '''
+    k_folds = KFold(n_splits=n_splits, shuffle=True, random_state=random_state)
+
+    return list(k_folds.split(x_data))
+
+def model_variants(alpha=1.0):
+    '''
+    Returns the six model variants of this folder keyed by name, as (estimator, scale) pairs.
+    '''
+    return {
+        "linear": (LinearRegression(), False),
+        "linear_scaled": (LinearRegression(), True),
+        "ridge": (Ridge(alpha=alpha), False),
+        "ridge_scaled": (Ridge(alpha=alpha), True),
+        "lasso": (Lasso(alpha=alpha), False),
+        "lasso_scaled": (Lasso(alpha=alpha), True),
+    }
+
+def _score_fold(estimator, scale, x_data, y_data, train_ind, val_ind):
+    '''
+    Fits a fresh copy of the estimator on one training fold and scores it.
+    '''
+    model = make_pipeline(StandardScaler(), clone(estimator)) if scale else clone(estimator)
+
+    x_train, y_train = x_data[train_ind], y_data[train_ind]
+    x_val, y_val = x_data[val_ind], y_data[val_ind]
+
+    model.fit(x_train, y_train)
+
+    return {"r2_train": model.score(x_train, y_train),
+            "r2_val": model.score(x_val, y_val),
+            "mse": mean_squared_error(y_val, model.predict(x_val))}
+
+def cross_validate_variants(variants, x_data, y_data, folds=None, n_jobs=-1):
+    '''
+    Cross-validates several models, running every (model, fold) pair in parallel.
+
+    Parameters
+    ----------
+    variants : A dictionary of name to (estimator, scale) pairs.
+    x_data : Feature training and validation set.
+    y_data : Target training and validation set.
+    folds : Precomputed (train_ind, val_ind) pairs, five shuffled folds by default.
+    n_jobs : The number of worker processes, -1 for one per core.
+
+    Returns
+    -------
+    A dictionary of name to a list of per-fold dictionaries of r2_train, r2_val and mse.
+    '''
+    x_data = np.asarray(x_data, dtype=float)
+    y_data = np.asarray(y_data, dtype=float)
+    folds = folds if folds is not None else make_folds(x_data)
+
+    tasks = [(name, fold) for name in variants for fold in range(len(folds))]
+    scores = Parallel(n_jobs=n_jobs)(
+        delayed(_score_fold)(*variants[name], x_data, y_data, *folds[fold])
+        for name, fold in tasks)
+
+    results = {name: [] for name in variants}
+    for (name, fold), score in zip(tasks, scores):
+        results[name].append({"fold": fold, **score})
+
+    return results
+
+def cross_validate_model(estimator, x_data, y_data, scale=False, folds=None, n_jobs=-1):
+    '''
+    Cross-validates one model.
+
+    Parameters
+    ----------
+    estimator : An unfitted scikit-learn regressor.
+    x_data : Feature training and validation set.
+    y_data : Target training and validation set.
+    scale : Whether features are standard scaled on each training fold.
+    folds : Precomputed (train_ind, val_ind) pairs, five shuffled folds by default.
+    n_jobs : The number of worker processes, -1 for one per core.
+
+    Returns
+    -------
+    A list of per-fold dictionaries of r2_train, r2_val and mse.
+    '''
+    return cross_validate_variants({"model": (estimator, scale)}, x_data, y_data, folds,
+                                   n_jobs)["model"]
+
+def print_cv_results(title, fold_results):
+    '''
+    Prints the R^2 average of the k-folds for the train and validation data, and the
+    Mean Square Error of the model.
+    '''
+    print(f'{title}:\n'
+          f'R^2 Train: {np.mean([fold["r2_train"] for fold in fold_results])},\n'
+          f'R^2 Val: {np.mean([fold["r2_val"] for fold in fold_results])},\n'
+          f'MSE: {np.mean([fold["mse"] for fold in fold_results])},')
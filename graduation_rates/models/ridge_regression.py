@@ -0,0 +1,29 @@
+'''
+This script uses cross-validation to test a Ridge Regression model using
+training data.
+'''
+from sklearn.linear_model import Ridge
+
+from .cross_validation import cross_validate_model, print_cv_results
+
+def ridge_regression_model_testing(x_data, y_data, alpha):
+    '''
+    A function that models data with a ridge regression model using cross-validation
+    without scaling.
+
+    Parameters
+    ----------
+    X : Feature training and validation set.
+    y : Target training and validation set.
+    alpha : The regularization strength.
+
+    Returns
+    -------
+    A list of per-fold dictionaries of the R^2 for the train and validation data, and the
+    Mean Square Error of the model. Prints the averages of the k-folds.
+    '''
+    fold_results = cross_validate_model(Ridge(alpha=alpha), x_data, y_data)
+
+    print_cv_results('Ridge regression results', fold_results)
+
+    return fold_results
@@ -0,0 +1,119 @@
+'''
+This script cross-validates Linear Regression and Ridge models from sufficient statistics.
+The Gram matrix X^T X, X^T y and the sums of every validation block are computed once, and
+each training fold's normal equations are the totals minus its held-out block. Leave-one-out
+scores come from a single fit through the hat-matrix shortcut.
+'''
+import numpy as np
+
+from .cross_validation import make_folds
+
+def _block_statistics(x_block, y_block):
+    '''
+    Returns the count, sums, Gram matrix and cross products of one block of rows.
+    '''
+    return {"n": len(y_block), "sum_x": x_block.sum(axis=0), "sum_y": y_block.sum(),
+            "xtx": x_block.T @ x_block, "xty": x_block.T @ y_block, "yty": y_block @ y_block}
+
+def _solve(stats, alpha, scale):
+    '''
+    Solves the ridge normal equations, with an unpenalized intercept, from the statistics
+    of the training rows. An alpha of 0 gives ordinary least squares.
+
+    Returns
+    -------
+    The coefficients and intercept on the original feature scale, the centered Gram matrix,
+    the centered cross products and the total sum of squares of the target.
+    '''
+    n_rows = stats["n"]
+    x_mean, y_mean = stats["sum_x"] / n_rows, stats["sum_y"] / n_rows
+
+    gram = stats["xtx"] - n_rows * np.outer(x_mean, x_mean)
+    cross = stats["xty"] - n_rows * x_mean * y_mean
+    total = stats["yty"] - n_rows * y_mean ** 2
+
+    # Scaling by the training standard deviations is a change of variables, w = D w_scaled
+    x_std = np.sqrt(np.diag(gram) / n_rows) if scale else np.ones(len(x_mean))
+    x_std[x_std == 0] = 1.0
+    inv_std = 1 / x_std
+
+    lhs = gram * np.outer(inv_std, inv_std) + alpha * np.eye(len(x_mean))
+    coef = np.linalg.lstsq(lhs, cross * inv_std, rcond=None)[0] * inv_std
+
+    return coef, y_mean - x_mean @ coef, gram, cross, total
+
+def sufficient_stats_cv(x_data, y_data, alpha=0.0, scale=False, folds=None):
+    '''
+    Cross-validates a Linear Regression (alpha of 0) or Ridge model by downdating the
+    statistics of the full data with those of each held-out block.
+
+    Parameters
+    ----------
+    x_data : Feature training and validation set.
+    y_data : Target training and validation set.
+    alpha : The regularization strength, 0 for Linear Regression.
+    scale : Whether features are standard scaled on each training fold.
+    folds : Precomputed (train_ind, val_ind) pairs, five shuffled folds by default.
+
+    Returns
+    -------
+    A list of per-fold dictionaries of r2_train, r2_val and mse.
+    '''
+    x_data = np.asarray(x_data, dtype=float)
+    y_data = np.asarray(y_data, dtype=float)
+    folds = folds if folds is not None else make_folds(x_data)
+
+    blocks = [_block_statistics(x_data[val_ind], y_data[val_ind]) for _, val_ind in folds]
+    totals = {key: sum(block[key] for block in blocks) for key in blocks[0]}
+
+    fold_results = []
+    for fold, ((_, val_ind), block) in enumerate(zip(folds, blocks)):
+        train_stats = {key: totals[key] - block[key] for key in totals}
+        coef, intercept, gram, cross, total = _solve(train_stats, alpha, scale)
+
+        # Training residual sum of squares from the centered statistics alone
+        train_sse = total - 2 * coef @ cross + coef @ gram @ coef
+
+        y_val = y_data[val_ind]
+        val_residuals = y_val - (x_data[val_ind] @ coef + intercept)
+        mse = val_residuals @ val_residuals / len(y_val)
+
+        fold_results.append({"fold": fold, "r2_train": 1 - train_sse / total,
+                             "r2_val": 1 - mse / y_val.var(), "mse": mse})
+
+    return fold_results
+
+def leave_one_out(x_data, y_data, alpha=0.0, scale=False):
+    '''
+    Computes exact leave-one-out residuals of a Linear Regression or Ridge model from one
+    fit, dividing each residual by one minus the leverage of its row. With scale set the
+    features are scaled by the full-data standard deviations rather than refit per row.
+
+    Parameters
+    ----------
+    x_data : Feature training and validation set.
+    y_data : Target training and validation set.
+    alpha : The regularization strength, 0 for Linear Regression.
+    scale : Whether features are standard scaled.
+
+    Returns
+    -------
+    A dictionary of the leave-one-out mse, the predictive r2 and the residuals.
+    '''
+    x_data = np.asarray(x_data, dtype=float)
+    y_data = np.asarray(y_data, dtype=float)
+
+    stats = _block_statistics(x_data, y_data)
+    coef, intercept, gram, _, total = _solve(stats, alpha, scale)
+
+    x_std = np.sqrt(np.diag(gram) / stats["n"]) if scale else np.ones(x_data.shape[1])
+    x_std[x_std == 0] = 1.0
+    x_scaled = (x_data - stats["sum_x"] / stats["n"]) / x_std
+
+    inverse = np.linalg.pinv(gram / np.outer(x_std, x_std) + alpha * np.eye(len(x_std)))
+    leverage = 1 / stats["n"] + np.einsum("ij,jk,ik->i", x_scaled, inverse, x_scaled)
+
+    residuals = (y_data - (x_data @ coef + intercept)) / (1 - leverage)
+    press = residuals @ residuals
+
+    return {"mse": press / len(y_data), "r2": 1 - press / total, "residuals": residuals}
@@ -0,0 +1,133 @@
+'''
+This script selects a model with a successive-halving tournament. Every candidate, a
+Linear, Ridge or LASSO model with or without scaling and with its own alpha, is first
+cross-validated on a small shuffled subset of the universities. Only the best 1/factor of the
+candidates move on to the next rung, which uses factor times as many rows, until the last
+rung is cross-validated on all of them. On every rung the surviving alphas of a model family
+are fit together along one regularization path per fold, as in alpha_path, and the (family,
+fold) paths run in parallel with joblib. The result is a leaderboard ranked by the last rung
+each candidate reached and its MSE.
+'''
+import math
+
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+
+from .alpha_path import lasso_fold_path, ridge_fold_path
+from .cross_validation import make_folds
+
+# Linear Regression is the Ridge path at an alpha of 0, its least squares solution
+FOLD_PATHS = {"linear": ridge_fold_path, "ridge": ridge_fold_path, "lasso": lasso_fold_path}
+
+METRICS = ("r2_train", "r2_val", "mse")
+
+def candidate_grid(alphas, families=("linear", "ridge", "lasso"), scales=(False, True)):
+    '''
+    Returns the candidates of a tournament as a dictionary of name to (family, scale,
+    alpha), with one Ridge and LASSO candidate per alpha.
+
+    Parameters
+    ----------
+    alphas : The regularization strengths of the Ridge and LASSO candidates.
+    families : Which of "linear", "ridge" and "lasso" to include.
+    scales : Whether candidates are tried without and with standard scaling.
+    '''
+    candidates = {}
+    for scale in scales:
+        suffix = "_scaled" if scale else ""
+        if "linear" in families:
+            candidates[f"linear{suffix}"] = ("linear", scale, 0.0)
+        for family in ("ridge", "lasso"):
+            if family in families:
+                for alpha in alphas:
+                    candidates[f"{family}{suffix}(alpha={alpha:.4g})"] = (family, scale,
+                                                                         float(alpha))
+
+    return candidates
+
+def rung_sizes(n_rows, n_candidates, factor=3, min_rows=100):
+    '''
+    Returns the number of rows of every rung, each factor times the last and the final
+    one all n_rows, with enough rungs to narrow n_candidates down to about one.
+    '''
+    n_rungs = max(1, math.ceil(math.log(n_candidates, factor))) if n_candidates > 1 else 1
+
+    return [min(n_rows, max(min_rows, int(n_rows / factor ** (n_rungs - 1 - rung))))
+            for rung in range(n_rungs)]
+
+def _score_rung(candidates, survivors, x_rung, y_rung, folds, n_jobs):
+    '''
+    Cross-validates the surviving candidates on the rows of one rung.
+
+    Returns
+    -------
+    A dictionary of candidate name to its mean r2_train, r2_val and mse over the folds.
+    '''
+    groups = {}
+    for name in survivors:
+        family, scale, _ = candidates[name]
+        groups.setdefault((family, scale), []).append(name)
+
+    tasks = [(group, fold) for group in groups for fold in folds]
+    paths = Parallel(n_jobs=n_jobs)(
+        delayed(FOLD_PATHS[family])(x_rung, y_rung, *fold,
+                                    np.array([candidates[name][2]
+                                              for name in groups[(family, scale)]]), scale)
+        for (family, scale), fold in tasks)
+
+    scores = {}
+    for group, names in groups.items():
+        group_paths = [path for (task_group, _), path in zip(tasks, paths) if task_group == group]
+        for position, name in enumerate(names):
+            scores[name] = {metric: np.mean([path[metric][position] for path in group_paths])
+                            for metric in METRICS}
+
+    return scores
+
+def successive_halving(candidates, x_data, y_data, factor=3, n_splits=5, min_rows=100,
+                       random_state=None, n_jobs=-1):
+    '''
+    Runs a successive-halving tournament between candidate models.
+
+    Parameters
+    ----------
+    candidates : A dictionary of name to (family, scale, alpha), such as candidate_grid.
+    x_data : Feature training and validation set.
+    y_data : Target training and validation set.
+    factor : The share of candidates dropped, and growth of rows, between rungs.
+    n_splits : The number of cross-validation folds on every rung.
+    min_rows : The fewest rows a rung is cross-validated on.
+    random_state : The seed of the row subsets and folds.
+    n_jobs : The number of worker processes, -1 for one per core.
+
+    Returns
+    -------
+    leaderboard : A dataframe with one row per candidate of its rank, last rung, the rows it
+    was cross-validated on there and its mean r2_train, r2_val and mse.
+    '''
+    x_data = np.asarray(x_data, dtype=float)
+    y_data = np.asarray(y_data, dtype=float)
+    order = np.random.default_rng(random_state).permutation(len(y_data))
+
+    survivors = list(candidates)
+    results = {}
+    for rung, n_rows in enumerate(rung_sizes(len(y_data), len(survivors), factor, min_rows)):
+        # Every rung is a larger prefix of the same shuffled rows
+        rows = order[:n_rows]
+        x_rung, y_rung = x_data[rows], y_data[rows]
+        folds = make_folds(x_rung, n_splits, random_state)
+
+        for name, scores in _score_rung(candidates, survivors, x_rung, y_rung, folds,
+                                        n_jobs).items():
+            results[name] = {"candidate": name, "rung": rung, "rows": n_rows, **scores}
+
+        survivors = sorted(survivors, key=lambda name: results[name]["mse"])
+        survivors = survivors[:max(1, math.ceil(len(survivors) / factor))]
+
+    leaderboard = pd.DataFrame(list(results.values()))
+    leaderboard = leaderboard.sort_values(["rung", "mse"], ascending=[False, True],
+                                          ignore_index=True)
+    leaderboard.insert(0, "rank", np.arange(1, len(leaderboard) + 1))
+
+    return leaderboard
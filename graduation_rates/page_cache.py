@@ -0,0 +1,203 @@
+'''
+This module keeps a persistent cache of College Results Online profile pages in a SQLite
+file. Page bodies are stored zlib-compressed and keyed by the SHA-256 hash of their content,
+so identical pages are stored once. Each IPEDS ID points at its current body along with the
+ETag and Last-Modified headers used to revalidate it once its time to live has passed.
+A cache opened as an archive keeps every raw page on this and every later run, and
+reparse_archive re-derives the dataset from it when the parsing of the pages changes.
+'''
+import hashlib
+import sqlite3
+import threading
+import time
+import zlib
+from collections import namedtuple
+
+CachedPage = namedtuple("CachedPage", ["body", "etag", "last_modified", "fetched_at"])
+
+class CacheMiss(KeyError):
+    '''
+    Raised in offline mode when a page is not in the cache.
+    '''
+
+class PageCache:
+    '''
+    A SQLite store of profile pages keyed by IPEDS ID.
+
+    Parameters
+    ----------
+    path : The SQLite file holding the cache.
+    ttl_days : The number of days a page is used without revalidating it.
+    max_bytes : The compressed size the cache is trimmed to, least recently used first, or
+                None to keep every page.
+    offline : Whether pages are only ever read from the cache.
+    archive : Whether to keep every page as an archive for reparse_archive. The mode is
+              stored in the file, so a cache opened once as an archive is never trimmed.
+    '''
+    def __init__(self, path="page_cache.sqlite", ttl_days=30, max_bytes=500 * 2**20,
+                 offline=False, archive=False):
+        self.ttl_seconds = ttl_days * 86400
+        self.offline = offline
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.executescript('''
+            CREATE TABLE IF NOT EXISTS bodies (
+                content_hash TEXT PRIMARY KEY,
+                body BLOB NOT NULL,
+                size INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS pages (
+                ipeds_id TEXT PRIMARY KEY,
+                content_hash TEXT NOT NULL REFERENCES bodies (content_hash),
+                etag TEXT,
+                last_modified TEXT,
+                fetched_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS metadata (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            );
+        ''')
+
+        if archive:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO metadata VALUES ('archive', '1')")
+            self._connection.commit()
+        self.archive = self._connection.execute(
+            "SELECT 1 FROM metadata WHERE key = 'archive'").fetchone() is not None
+        self.max_bytes = None if self.archive else max_bytes
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        '''
+        Trims the cache to max_bytes and closes the SQLite file.
+        '''
+        self.evict()
+        self._connection.close()
+
+    def get(self, ipeds_id):
+        '''
+        Returns the CachedPage for ipeds_id, or None if it is not cached.
+        '''
+        with self._lock:
+            row = self._connection.execute('''
+                SELECT bodies.body, pages.etag, pages.last_modified, pages.fetched_at
+                FROM pages JOIN bodies USING (content_hash)
+                WHERE pages.ipeds_id = ?
+            ''', (ipeds_id,)).fetchone()
+            if row is None:
+                return None
+
+            self._connection.execute('UPDATE pages SET accessed_at = ? WHERE ipeds_id = ?',
+                                     (time.time(), ipeds_id))
+            self._connection.commit()
+
+        body, etag, last_modified, fetched_at = row
+        return CachedPage(zlib.decompress(body).decode("utf-8"), etag, last_modified,
+                          fetched_at)
+
+    def is_fresh(self, cached_page):
+        '''
+        Returns whether a cached page is younger than the time to live.
+        '''
+        return time.time() - cached_page.fetched_at < self.ttl_seconds
+
+    def put(self, ipeds_id, body, etag=None, last_modified=None):
+        '''
+        Stores the body of a freshly downloaded page along with its validators.
+        '''
+        encoded = body.encode("utf-8")
+        content_hash = hashlib.sha256(encoded).hexdigest()
+        compressed = zlib.compress(encoded, 9)
+        now = time.time()
+
+        with self._lock:
+            self._connection.execute(
+                'INSERT OR IGNORE INTO bodies (content_hash, body, size) VALUES (?, ?, ?)',
+                (content_hash, compressed, len(compressed)))
+            self._connection.execute(
+                'INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?)',
+                (ipeds_id, content_hash, etag, last_modified, now, now))
+            self._connection.commit()
+
+    def touch(self, ipeds_id):
+        '''
+        Marks a cached page as revalidated, restarting its time to live.
+        '''
+        with self._lock:
+            now = time.time()
+            self._connection.execute(
+                'UPDATE pages SET fetched_at = ?, accessed_at = ? WHERE ipeds_id = ?',
+                (now, now, ipeds_id))
+            self._connection.commit()
+
+    def delete(self, ipeds_id):
+        '''
+        Drops the cached page of ipeds_id, leaving its body to the next eviction.
+        '''
+        with self._lock:
+            self._connection.execute('DELETE FROM pages WHERE ipeds_id = ?', (ipeds_id,))
+            self._connection.commit()
+
+    def ipeds_ids(self):
+        '''
+        Returns the list of IPEDS IDs with a cached page.
+        '''
+        with self._lock:
+            rows = self._connection.execute('SELECT ipeds_id FROM pages').fetchall()
+
+        return [ipeds_id for (ipeds_id,) in rows]
+
+    def compressed_bodies(self, ipeds_ids):
+        '''
+        Returns a dictionary of IPEDS ID to the zlib-compressed body of its cached page for
+        the IDs that have one, read in one query without marking the pages as used.
+        '''
+        ipeds_ids = list(ipeds_ids)
+        with self._lock:
+            rows = self._connection.execute(f'''
+                SELECT pages.ipeds_id, bodies.body
+                FROM pages JOIN bodies USING (content_hash)
+                WHERE pages.ipeds_id IN ({", ".join("?" * len(ipeds_ids))})
+            ''', ipeds_ids).fetchall()
+
+        return dict(rows)
+
+    def evict(self):
+        '''
+        Deletes the least recently used pages until the stored bodies fit in max_bytes.
+        '''
+        if self.max_bytes is None:
+            return
+
+        with self._lock:
+            self._connection.execute('''
+                DELETE FROM bodies WHERE content_hash NOT IN (SELECT content_hash FROM pages)
+            ''')
+            total_bytes = self._connection.execute(
+                'SELECT COALESCE(SUM(size), 0) FROM bodies').fetchone()[0]
+
+            pages = self._connection.execute('''
+                SELECT pages.ipeds_id, pages.content_hash, bodies.size
+                FROM pages JOIN bodies USING (content_hash)
+                ORDER BY pages.accessed_at
+            ''').fetchall()
+
+            for ipeds_id, content_hash, size in pages:
+                if total_bytes <= self.max_bytes:
+                    break
+                self._connection.execute('DELETE FROM pages WHERE ipeds_id = ?', (ipeds_id,))
+                shared = self._connection.execute(
+                    'SELECT 1 FROM pages WHERE content_hash = ?', (content_hash,)).fetchone()
+                if shared is None:
+                    self._connection.execute('DELETE FROM bodies WHERE content_hash = ?',
+                                             (content_hash,))
+                    total_bytes -= size
+
+            self._connection.commit()
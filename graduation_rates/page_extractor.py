@@ -0,0 +1,131 @@
+'''
+This module extracts the fields of a College Results Online profile page in a single pass
+over the page's data cells. Each field is described by one entry of COLLEGE_FIELDS giving
+the position of its cell and the parser that turns the cell text into a value.
+'''
+from lxml import etree, html
+
+# Errors raised by extract_college_fields for a page that is empty, not HTML or missing cells
+PARSE_ERRORS = (NameError, IndexError, AttributeError, UnicodeDecodeError, etree.LxmlError)
+
+def str_to_int(string):
+    '''
+    A helper function to turn a string to an integer
+
+    Parameters
+    ----------
+    string : A string of text.
+
+    Returns
+    -------
+    A floating point number if the text is a number and None otherwise.
+    '''
+    try:
+        return float(string)
+    except (IndexError, ValueError):
+        return None
+
+def parse_text(text):
+    '''
+    Returns the cell text unchanged.
+    '''
+    return text
+
+def parse_number(text):
+    '''
+    Parses a plain number such as a GPA.
+    '''
+    return str_to_int(text)
+
+def parse_count(text):
+    '''
+    Parses a count written with thousands separators, e.g. "12,345".
+    '''
+    return str_to_int(text.replace(",", ""))
+
+def parse_percent(text):
+    '''
+    Parses a percentage written with a trailing percent sign, e.g. "58.1%".
+    '''
+    return str_to_int(text[:-1])
+
+def parse_dollars(text):
+    '''
+    Parses a dollar amount written with a leading dollar sign, e.g. "$18,368".
+    '''
+    return str_to_int(text[1:].replace(",", ""))
+
+def parse_sat(text):
+    '''
+    Parses the first three characters of an SAT score.
+    '''
+    return str_to_int(text[:3])
+
+def parse_act(text):
+    '''
+    Parses the first four characters of an ACT score.
+    '''
+    return str_to_int(text[:4])
+
+# Field name, index of the cell among the page's .data cells, and the parser for the cell
+COLLEGE_FIELDS = (
+    ("state", 3, parse_text),
+    ("size_undergrads", 13, parse_count),
+    ("percent_admitted", 26, parse_percent),
+    ("in_state_tuition", 27, parse_dollars),
+    ("out_state_tuition", 28, parse_dollars),
+    ("sector", 11, parse_text),
+    ("average_gpa", 19, parse_number),
+    ("percent_part_time", 49, parse_percent),
+    ("admission_test", 20, parse_text),
+    ("median_sat_verbal", 21, parse_sat),
+    ("median_sat_math", 22, parse_sat),
+    ("median_act_composite", 24, parse_act),
+    ("percent_underrep_minority", 36, parse_percent),
+    ("pell_percent", 35, parse_percent),
+    ("retention_rate", 6, parse_percent),
+    ("four_year_grad_rate", 7, parse_percent),
+    ("five_year_grad_rate", 8, parse_percent),
+    ("six_year_grad_rate", 9, parse_percent),
+)
+
+HEADERS = ["ipeds_id", "college_name"] + [name for name, _, _ in COLLEGE_FIELDS]
+
+_DATA_CELLS = etree.XPath("//*[contains(concat(' ', normalize-space(@class), ' '), ' data ')]")
+_FIRST_HEADING = etree.XPath("(//h2)[1]")
+
+def extract_college_fields(page, link):
+    '''
+    Creates a dictionary of the categories of scraped data from the HTML of one university's
+    profile page, reading every .data cell once.
+
+    Parameters
+    ----------
+    page : The HTML text of the profile page.
+    link : The unique part of the link for the university.
+
+    Returns
+    -------
+    A dictionary of scraped data for the univerisity.
+    '''
+    tree = html.fromstring(page)
+    cells = _DATA_CELLS(tree)
+
+    college_dict = {"ipeds_id": link, "college_name": _FIRST_HEADING(tree)[0].text_content()}
+
+    for name, index, parser in COLLEGE_FIELDS:
+        college_dict[name] = parser(cells[index].text_content())
+
+    return college_dict
+
+def is_valid_college_dict(college_dict):
+    '''
+    Returns whether a dictionary from extract_college_fields has every field, a university
+    name, text in its text fields and a number or None in every other field.
+    '''
+    if set(college_dict) != set(HEADERS) or not college_dict["college_name"]:
+        return False
+
+    return all(isinstance(college_dict[name], str) if parser is parse_text
+               else college_dict[name] is None or isinstance(college_dict[name], float)
+               for name, _, parser in COLLEGE_FIELDS)
@@ -0,0 +1,268 @@
+'''
+This module stores the college dataframes of many data years as one partitioned dataset.
+Each data year is a directory of Parquet files written by write_dataset, split by state when
+asked, under a root directory:
+
+    panel/clean/data_year=2024/state=CA/part.parquet
+
+A manifest at the root records the fingerprint of the inputs every year was built from, so a
+year is only rebuilt when its inputs change, and reading a range of years only opens the files
+of those years.
+'''
+import hashlib
+import json
+import os
+import shutil
+import time
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+from .dataset_store import DATASET_VERSION, DUMMY_PREFIXES, write_dataset
+
+MANIFEST = "_manifest.json"
+YEAR_COLUMN = "data_year"
+STATE_COLUMN = "state"
+
+# The panels of scraped and cleaned universities under a panel directory
+RAW_PANEL = "raw"
+CLEAN_PANEL = "clean"
+
+def parse_years(years):
+    '''
+    Returns the list of years in a string such as "2015-2024" or "2019,2021", or None for None.
+    '''
+    if years is None:
+        return None
+
+    parsed = []
+    for part in str(years).split(","):
+        first, _, last = part.partition("-")
+        parsed.extend(range(int(first), int(last or first) + 1))
+
+    return parsed
+
+def fingerprint(*inputs):
+    '''
+    Returns a SHA-256 hex digest of the inputs. Paths of existing files are hashed by content
+    and everything else by its JSON representation.
+    '''
+    digest = hashlib.sha256()
+    for value in inputs:
+        if isinstance(value, (str, os.PathLike)) and os.path.isfile(value):
+            with open(value, "rb") as input_file:
+                for block in iter(lambda: input_file.read(1 << 20), b""):
+                    digest.update(block)
+        else:
+            digest.update(json.dumps(value, sort_keys=True, default=str).encode())
+
+    return digest.hexdigest()
+
+def load_manifest(root):
+    '''
+    Returns the manifest of a panel, a dictionary of data year to its partition entry.
+    '''
+    path = os.path.join(root, MANIFEST)
+    if not os.path.exists(path):
+        return {}
+
+    with open(path, encoding="utf-8") as manifest_file:
+        return json.load(manifest_file)
+
+def _save_manifest(root, manifest):
+    # Replace the manifest in one rename so that readers never see half of it
+    path = os.path.join(root, MANIFEST)
+    with open(path + ".tmp", "w", encoding="utf-8") as manifest_file:
+        json.dump(manifest, manifest_file, indent=2, sort_keys=True)
+    os.replace(path + ".tmp", path)
+
+def panel_years(root, years=None):
+    '''
+    Returns the sorted data years stored in a panel, only those in years when given.
+    '''
+    return sorted(int(year) for year in load_manifest(root)
+                  if years is None or int(year) in years)
+
+def is_stale(root, data_year, input_fingerprint):
+    '''
+    Returns whether a data year is missing from the panel or was built from other inputs.
+    '''
+    entry = load_manifest(root).get(str(data_year))
+
+    return (entry is None or entry["fingerprint"] != input_fingerprint
+            or entry["dataset_version"] != DATASET_VERSION)
+
+def year_metadata(root, data_year):
+    '''
+    Returns the metadata stored with a data year by write_partition.
+    '''
+    return load_manifest(root)[str(data_year)]["metadata"]
+
+def write_partition(college_df, root, data_year, input_fingerprint, partition_by_state=False,
+                    metadata=None):
+    '''
+    Writes the college dataframe of one data year to the panel, replacing the year if it
+    was already stored.
+
+    Parameters
+    ----------
+    college_df : The college dataframe of the year. A data_year column, if any, is dropped.
+    root : The panel directory, created if it does not exist.
+    data_year : The data year of the universities.
+    input_fingerprint : The fingerprint of the inputs the dataframe was built from.
+    partition_by_state : Whether to write one file per state instead of one for the year.
+    metadata : A JSON-able dictionary stored with the year, such as its imputation statistics.
+    '''
+    college_df = college_df.drop(columns=[YEAR_COLUMN], errors="ignore")
+    year_directory = f"{YEAR_COLUMN}={data_year}"
+    scratch = os.path.join(root, f".{year_directory}.tmp")
+    shutil.rmtree(scratch, ignore_errors=True)
+
+    # Write the year into a scratch directory first, so a failed write keeps the old year
+    files = []
+    if partition_by_state:
+        states = college_df[STATE_COLUMN].astype(str)
+        for state, state_df in college_df.groupby(states.to_numpy(), sort=True):
+            state_directory = f"{STATE_COLUMN}={state}"
+            files.append(os.path.join(year_directory, state_directory, "part.parquet"))
+            os.makedirs(os.path.join(scratch, state_directory))
+            write_dataset(state_df.drop(columns=[STATE_COLUMN]).reset_index(drop=True),
+                          os.path.join(scratch, state_directory, "part.parquet"))
+    else:
+        files.append(os.path.join(year_directory, "part.parquet"))
+        os.makedirs(scratch)
+        write_dataset(college_df.reset_index(drop=True), os.path.join(scratch, "part.parquet"))
+
+    _replace_year(root, data_year, scratch, files, input_fingerprint, len(college_df),
+                  metadata)
+
+def import_partition(path, root, data_year, input_fingerprint, rows, metadata=None):
+    '''
+    Moves a Parquet file written by write_dataset or DatasetWriter into the panel as the
+    only file of one data year, replacing the year if it was already stored.
+
+    Parameters
+    ----------
+    path : The Parquet file, which must be on the same file system as root.
+    root : The panel directory, created if it does not exist.
+    data_year : The data year of the universities in the file.
+    input_fingerprint : The fingerprint of the inputs the file was built from.
+    rows : The number of universities in the file.
+    metadata : A JSON-able dictionary stored with the year.
+    '''
+    year_directory = f"{YEAR_COLUMN}={data_year}"
+    scratch = os.path.join(root, f".{year_directory}.tmp")
+    shutil.rmtree(scratch, ignore_errors=True)
+    os.makedirs(scratch)
+    os.replace(path, os.path.join(scratch, "part.parquet"))
+
+    _replace_year(root, data_year, scratch, [os.path.join(year_directory, "part.parquet")],
+                  input_fingerprint, rows, metadata)
+
+def _replace_year(root, data_year, scratch, files, input_fingerprint, rows, metadata):
+    # Swap the finished scratch directory in for the year and record it in the manifest
+    year_directory = os.path.join(root, f"{YEAR_COLUMN}={data_year}")
+    shutil.rmtree(year_directory, ignore_errors=True)
+    os.replace(scratch, year_directory)
+
+    manifest = load_manifest(root)
+    manifest[str(data_year)] = {"fingerprint": input_fingerprint,
+                                "dataset_version": DATASET_VERSION,
+                                "files": files, "rows": rows,
+                                "built_at": time.time(), "metadata": metadata or {}}
+    _save_manifest(root, manifest)
+
+def _year_dataset(root, manifest, data_year):
+    # A pyarrow dataset over the files of one data year, with its partition keys as columns
+    entry = manifest[str(data_year)]
+    if entry["dataset_version"] != DATASET_VERSION:
+        raise ValueError(f"{root} year {data_year} has dataset version "
+                         f"{entry['dataset_version']}, expected {DATASET_VERSION}")
+
+    return ds.dataset([os.path.join(root, file) for file in entry["files"]],
+                      format="parquet", partitioning="hive", partition_base_dir=root)
+
+def _string_states(table):
+    # States are a partition key in some years and a categorical column in others
+    if STATE_COLUMN in table.column_names:
+        table = table.set_column(table.column_names.index(STATE_COLUMN), STATE_COLUMN,
+                                 table[STATE_COLUMN].cast(pa.string()))
+
+    return table
+
+def _to_frame(table, columns):
+    # Put the columns in the requested order, with missing dummy variables set to 0
+    college_df = table.to_pandas()
+    columns = list(columns or college_df.columns)
+
+    dummy_columns = [column for column in columns if column.startswith(DUMMY_PREFIXES)]
+    college_df = college_df.reindex(columns=columns)
+    college_df[dummy_columns] = college_df[dummy_columns].fillna(0).astype("int8")
+    if STATE_COLUMN in columns:
+        college_df[STATE_COLUMN] = college_df[STATE_COLUMN].astype("category")
+
+    return college_df
+
+def read_panel(root, years=None, columns=None, states=None):
+    '''
+    Reads data years from a panel, opening only the files of the requested years and states.
+
+    Parameters
+    ----------
+    root : The panel directory.
+    years : The data years to load, or None for every stored year.
+    columns : The columns to load, or None for all of them. data_year and state may be asked
+              for whether or not the panel is partitioned on them.
+    states : The states to load, or None for all of them.
+
+    Returns
+    -------
+    college_df : The universities of all requested years. Dummy variables missing from a
+    year, because none of its universities had that level, are filled with 0.
+    '''
+    manifest = load_manifest(root)
+    selected = panel_years(root, years)
+    if not selected:
+        raise ValueError(f"{root} has no data for the years {years}")
+
+    tables = []
+    for data_year in selected:
+        dataset = _year_dataset(root, manifest, data_year)
+        names = dataset.schema.names
+        row_filter = (ds.field(STATE_COLUMN).isin(list(states))
+                      if states is not None and STATE_COLUMN in names else None)
+        tables.append(_string_states(dataset.to_table(
+            columns=[name for name in names if columns is None or name in columns],
+            filter=row_filter)))
+
+    return _to_frame(pa.concat_tables(tables, promote_options="permissive"), columns)
+
+def iter_panel(root, years=None, columns=None, batch_rows=1_000_000, states=None):
+    '''
+    Reads data years from a panel in batches, so that only one batch of rows is in memory
+    at a time.
+
+    Parameters
+    ----------
+    root : The panel directory.
+    years : The data years to load, or None for every stored year.
+    columns : The columns to load, or None for all of them.
+    batch_rows : The largest number of rows in a batch.
+    states : The states to load, or None for all of them.
+
+    Returns
+    -------
+    A generator of college dataframes, filled in as read_panel does.
+    '''
+    manifest = load_manifest(root)
+    selected = panel_years(root, years)
+    if not selected:
+        raise ValueError(f"{root} has no data for the years {years}")
+
+    for data_year in selected:
+        dataset = _year_dataset(root, manifest, data_year)
+        row_filter = (ds.field(STATE_COLUMN).isin(list(states))
+                      if states is not None and STATE_COLUMN in dataset.schema.names else None)
+        names = [name for name in dataset.schema.names if columns is None or name in columns]
+        for batch in dataset.to_batches(columns=names, filter=row_filter, batch_size=batch_rows):
+            yield _to_frame(_string_states(pa.Table.from_batches([batch])), columns)
@@ -0,0 +1,323 @@
+'''
+This module finds the peer institutions of a university: the universities closest to it on
+the standard scaled features of the final model. The scaled feature matrix is indexed by a
+KD-tree, so a batch of k-nearest-neighbor queries only visits nearby leaves instead of
+measuring the distance to every university. Universities added or changed after the tree was
+built are kept in a buffer that is searched by brute force alongside it, and the tree is only
+rebuilt once the buffer and the replaced rows grow past a share of the indexed rows.
+'''
+import os
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.neighbors import KDTree
+
+from .dataset_store import ID_COLUMN, NAME_COLUMN
+from .instrumentation import count
+from .model_artifact import encode_features
+from .scenarios import sector_labels
+
+PEER_INDEX_VERSION = 1
+
+# Filtered queries over fewer universities than this skip the tree
+BRUTE_FORCE_ROWS = 2048
+
+def peer_index_path(artifact_path):
+    '''
+    Returns the path of the peer index saved next to a model artifact, e.g.
+    graduation_rate_model.peers.joblib for graduation_rate_model.json.
+    '''
+    return os.path.splitext(artifact_path)[0] + ".peers.joblib"
+
+def _brute_force(features, candidates, k, block_cells=1 << 22):
+    '''
+    Returns the distances and positions of the k nearest candidates of every row of features,
+    nearest first, computing the distances of blocks of rows at once.
+    '''
+    k = min(k, len(candidates))
+    distances = np.empty((len(features), k))
+    positions = np.empty((len(features), k), dtype=np.int64)
+
+    block_rows = max(1, block_cells // max(1, candidates.size))
+    for start in range(0, len(features), block_rows):
+        block = features[start:start + block_rows]
+        block_distances = np.sqrt(((block[:, None, :] - candidates[None, :, :]) ** 2).sum(2))
+
+        # Partition out the k nearest, then sort only those
+        nearest = np.argpartition(block_distances, k - 1, axis=1)[:, :k]
+        nearest_distances = np.take_along_axis(block_distances, nearest, axis=1)
+        order = np.argsort(nearest_distances, axis=1)
+        distances[start:start + block_rows] = np.take_along_axis(nearest_distances, order, 1)
+        positions[start:start + block_rows] = np.take_along_axis(nearest, order, 1)
+
+    return distances, positions
+
+class PeerIndex:
+    '''
+    A nearest-neighbor index of universities on the scaled features of a model artifact.
+
+    Parameters
+    ----------
+    artifact : The model artifact whose feature columns, imputation statistics and scaler
+               define the features.
+    leaf_size : The leaf size of the KD-tree.
+    rebuild_fraction : The share of the rows in the tree that may be added or replaced since
+                       it was built before it is rebuilt.
+    '''
+    def __init__(self, artifact, leaf_size=40, rebuild_fraction=.1):
+        self.artifact = artifact
+        self.leaf_size = leaf_size
+        self.rebuild_fraction = rebuild_fraction
+        self.source_fingerprint = None
+
+        # Rows [0, n_tree) are in the tree and the rest are in the brute-force buffer
+        self.features = np.empty((0, len(artifact["feature_columns"])))
+        self.ids = np.empty(0, dtype=np.int64)
+        self.names = np.empty(0, dtype=object)
+        self.states = np.empty(0, dtype=object)
+        self.sectors = np.empty(0, dtype=object)
+        self.active = np.empty(0, dtype=bool)
+        self.tree = None
+        self.n_tree = 0
+
+    def __len__(self):
+        return int(self.active.sum())
+
+    def matches(self, artifact):
+        '''
+        Returns whether the index was built on the same features and scaling as an artifact.
+        '''
+        return (self.artifact["feature_columns"] == artifact["feature_columns"]
+                and self.artifact["imputation_stats"] == artifact["imputation_stats"]
+                and np.array_equal(self.artifact["scaler_mean"], artifact["scaler_mean"])
+                and np.array_equal(self.artifact["scaler_scale"], artifact["scaler_scale"]))
+
+    def scale(self, college_df):
+        '''
+        Returns the standard scaled feature matrix of a college dataframe, with missing
+        values imputed as the model does.
+        '''
+        features = encode_features(self.artifact, college_df)
+
+        return (features - self.artifact["scaler_mean"]) / self.artifact["scaler_scale"]
+
+    def update(self, college_df):
+        '''
+        Brings the index up to date with a college dataframe. Universities that are new or
+        whose features, name, state or sector changed are added to the buffer, replacing
+        their old rows, and those no longer in the dataframe are dropped. The last row of a
+        university wins, which is its latest data year in a panel, and universities with
+        features that cannot be imputed are left out.
+
+        Returns
+        -------
+        n_added, n_replaced, n_removed : The number of universities of each kind of change.
+        '''
+        college_df = college_df.drop_duplicates(ID_COLUMN, keep="last")
+        features = self.scale(college_df)
+        complete = ~np.isnan(features).any(axis=1)
+
+        features = features[complete]
+        ids = college_df[ID_COLUMN].to_numpy(dtype=np.int64)[complete]
+        names = college_df[NAME_COLUMN].astype(str).to_numpy(dtype=object)[complete]
+        states = college_df["state"].astype(str).to_numpy(dtype=object)[complete]
+        sectors = sector_labels(college_df).to_numpy(dtype=object)[complete]
+
+        # The current row of every university, or -1 for new ones
+        active_rows = np.flatnonzero(self.active)
+        positions = pd.Index(self.ids[active_rows]).get_indexer(ids)
+        known = positions >= 0
+        rows = np.full(len(ids), -1, dtype=np.int64)
+        rows[known] = active_rows[positions[known]]
+
+        changed = ~known
+        changed[known] = ((self.features[rows[known]] != features[known]).any(axis=1)
+                          | (self.names[rows[known]] != names[known])
+                          | (self.states[rows[known]] != states[known])
+                          | (self.sectors[rows[known]] != sectors[known]))
+        removed = active_rows[~np.isin(self.ids[active_rows], ids)]
+
+        self.active[rows[changed & known]] = False
+        self.active[removed] = False
+        self.features = np.concatenate([self.features, features[changed]])
+        self.ids = np.concatenate([self.ids, ids[changed]])
+        self.names = np.concatenate([self.names, names[changed]])
+        self.states = np.concatenate([self.states, states[changed]])
+        self.sectors = np.concatenate([self.sectors, sectors[changed]])
+        self.active = np.concatenate([self.active, np.ones(changed.sum(), dtype=bool)])
+
+        # Rows outside the tree and replaced rows inside it both slow queries down
+        n_stale = len(self.ids) - self.n_tree + int((~self.active[:self.n_tree]).sum())
+        if self.tree is None or n_stale > self.rebuild_fraction * self.n_tree:
+            self.rebuild()
+
+        n_added = int((~known).sum())
+        n_replaced = int((changed & known).sum())
+        count("peers_indexed", n_added + n_replaced, stage="peer_index",
+              peers_added=n_added, peers_replaced=n_replaced, peers_removed=len(removed))
+
+        return n_added, n_replaced, len(removed)
+
+    def rebuild(self):
+        '''
+        Drops the replaced rows and builds the KD-tree over every university.
+        '''
+        for name in ("features", "ids", "names", "states", "sectors"):
+            setattr(self, name, getattr(self, name)[self.active])
+        self.active = np.ones(len(self.ids), dtype=bool)
+
+        self.tree = KDTree(self.features, leaf_size=self.leaf_size) if len(self.ids) else None
+        self.n_tree = len(self.ids)
+
+    def _query_tree(self, features, k, allowed):
+        '''
+        Returns the distances and rows of the k nearest allowed rows of the tree, asking the
+        tree for more neighbors, in proportion to the share of rows allowed and doubling for
+        the queries still short of k, until every query has k.
+        '''
+        n_allowed = int(allowed.sum())
+        distances = np.full((len(features), k), np.inf)
+        rows = np.full((len(features), k), -1, dtype=np.int64)
+
+        n_neighbors = min(self.n_tree, int(np.ceil(k * self.n_tree / max(n_allowed, 1))))
+        pending = np.arange(len(features))
+        while len(pending):
+            found_distances, found_rows = self.tree.query(features[pending], k=n_neighbors)
+            keep = allowed[found_rows]
+            done = (keep.sum(axis=1) >= min(k, n_allowed)) | (n_neighbors == self.n_tree)
+
+            # Move the allowed neighbors of finished queries to the front, nearest first
+            order = np.argsort(~keep[done], axis=1, kind="stable")[:, :k]
+            width = order.shape[1]
+            kept = np.take_along_axis(keep[done], order, axis=1)
+            distances[pending[done], :width] = np.where(
+                kept, np.take_along_axis(found_distances[done], order, axis=1), np.inf)
+            rows[pending[done], :width] = np.where(
+                kept, np.take_along_axis(found_rows[done], order, axis=1), -1)
+
+            pending = pending[~done]
+            n_neighbors = min(self.n_tree, 2 * n_neighbors)
+
+        return distances, rows
+
+    def query(self, features, k=20, allowed=None):
+        '''
+        Finds the k nearest universities of every row of a scaled feature matrix.
+
+        Parameters
+        ----------
+        features : An (n_queries, n_features) array of scaled features, such as the output of
+                   scale.
+        k : The number of neighbors.
+        allowed : An optional boolean mask over the rows of the index of the universities
+                  that may be returned, such as the output of filter_rows.
+
+        Returns
+        -------
+        distances, rows : (n_queries, k) arrays of the Euclidean distances and index rows of
+        the neighbors, nearest first, padded with inf and -1 when fewer than k are allowed.
+        '''
+        features = np.atleast_2d(np.asarray(features, dtype=float))
+        allowed = self.active if allowed is None else allowed & self.active
+        in_tree = allowed[:self.n_tree]
+        use_tree = self.tree is not None and (in_tree.all() or in_tree.sum() > BRUTE_FORCE_ROWS)
+
+        distances = [np.full((len(features), k), np.inf)]
+        rows = [np.full((len(features), k), -1, dtype=np.int64)]
+        brute_force = allowed.copy()
+        if use_tree:
+            brute_force[:self.n_tree] = False
+            tree_distances, tree_rows = self._query_tree(features, k, in_tree)
+            distances.append(tree_distances)
+            rows.append(tree_rows)
+
+        candidates = np.flatnonzero(brute_force)
+        if len(candidates):
+            buffer_distances, positions = _brute_force(features, self.features[candidates], k)
+            distances.append(buffer_distances)
+            rows.append(candidates[positions])
+
+        # Merge the nearest k of the tree and the buffer
+        distances = np.hstack(distances)
+        rows = np.hstack(rows)
+        order = np.argsort(distances, axis=1, kind="stable")[:, :k]
+
+        return np.take_along_axis(distances, order, axis=1), np.take_along_axis(rows, order,
+                                                                                 axis=1)
+
+    def filter_rows(self, states=None, sectors=None):
+        '''
+        Returns a boolean mask over the rows of the index of the universities in the given
+        states and sectors, or None when neither is given.
+        '''
+        if states is None and sectors is None:
+            return None
+
+        allowed = self.active.copy()
+        if states is not None:
+            allowed &= np.isin(self.states, list(states))
+        if sectors is not None:
+            allowed &= np.isin(self.sectors, list(sectors))
+
+        return allowed
+
+    def peers(self, ipeds_ids, k=20, states=None, sectors=None):
+        '''
+        Finds the most similar universities to indexed universities.
+
+        Parameters
+        ----------
+        ipeds_ids : The IPEDS IDs of the universities to find peers of.
+        k : The number of peers of each university.
+        states : Optional states the peers must be in.
+        sectors : Optional sectors the peers must be in, e.g. "Public".
+
+        Returns
+        -------
+        peers_df : A dataframe with one row per university and peer of the university's
+        IPEDS ID, the rank of the peer and its IPEDS ID, name, state, sector and distance.
+        '''
+        ipeds_ids = np.asarray(ipeds_ids, dtype=np.int64)
+        active_rows = np.flatnonzero(self.active)
+        positions = pd.Index(self.ids[active_rows]).get_indexer(ipeds_ids)
+        if (positions < 0).any():
+            raise KeyError(f"Universities not in the peer index: "
+                           f"{ipeds_ids[positions < 0].tolist()}")
+        query_rows = active_rows[positions]
+
+        # Ask for one more neighbor and drop each university from its own peers
+        distances, rows = self.query(self.features[query_rows], k + 1,
+                                     self.filter_rows(states, sectors))
+        order = np.argsort(rows == query_rows[:, None], axis=1, kind="stable")[:, :k]
+        distances = np.take_along_axis(distances, order, axis=1)
+        rows = np.take_along_axis(rows, order, axis=1)
+
+        found = rows >= 0
+        peer_rows = rows[found]
+
+        return pd.DataFrame({ID_COLUMN: np.repeat(ipeds_ids, k)[found.ravel()],
+                             "rank": np.tile(np.arange(1, k + 1), len(ipeds_ids))[found.ravel()],
+                             "peer_ipeds_id": self.ids[peer_rows],
+                             "peer_name": self.names[peer_rows],
+                             "state": self.states[peer_rows],
+                             "sector": self.sectors[peer_rows],
+                             "distance": distances[found]})
+
+def save_peer_index(index, path):
+    '''
+    Writes a peer index to a file, replacing it in one rename.
+    '''
+    joblib.dump({"version": PEER_INDEX_VERSION, "index": index}, path + ".tmp")
+    os.replace(path + ".tmp", path)
+
+def load_peer_index(path):
+    '''
+    Reads a peer index written by save_peer_index, checking its version.
+    '''
+    saved = joblib.load(path)
+    if saved.get("version") != PEER_INDEX_VERSION:
+        raise ValueError(f"{path} has peer index version {saved.get('version')}, "
+                         f"expected {PEER_INDEX_VERSION}")
+
+    return saved["index"]
@@ -0,0 +1,283 @@
+'''
+This module runs the pipeline from the IPEDS ID csv to the model artifact as a DAG of stages.
+Every stage declares the files it reads and writes and its parameters, and its outputs are
+cached under a key that hashes the contents of its input files, its parameters and the source
+code of the stage and of the modules it calls. A stage only runs when no cached outputs match
+its key, so changing a modeling parameter retrains the model without cleaning the data again,
+and going back to an earlier setting restores its outputs from the cache. Stages whose inputs
+are ready run at the same time on a thread pool.
+
+    scrape -> clean -> impute -> final -> train
+                                       -> cv
+'''
+import importlib.util
+import inspect
+import json
+import os
+import shutil
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from .panel_store import fingerprint
+
+# inputs and outputs map the keyword arguments of function to file paths, and code lists
+# the modules, relative to this package, whose source is part of the cache key
+Stage = namedtuple("Stage", ["name", "function", "inputs", "outputs", "params", "code"])
+
+OUTPUTS_FILE = "_outputs.json"
+DEFAULT_CACHE_DIR = "pipeline_cache"
+
+# The intermediate datasets, written inside the cache directory
+INTERMEDIATE_FILES = {
+    "cleaned_df": "cleaned_college_df.parquet",
+    "imputed_df": "imputed_college_df.parquet",
+}
+
+DEFAULT_PATHS = {
+    "ids_csv": "Data/4-Year-Public-and-Private-Universities-and-IPEDS-IDs.csv",
+    "college_df": "college_df.parquet",
+    "imputation_stats": "imputation_stats.json",
+    "five_college_df": "five_college_df.parquet",
+    "artifact": "graduation_rate_model.json",
+    "cv_results": "cv_results.json",
+}
+
+DEFAULT_PARAMS = {
+    "scrape": {"page_cache": "page_cache.sqlite", "base_url": None, "max_workers": 8,
+               "requests_per_second": 5},
+    "clean": {},
+    "impute": {"strategy": "mean"},
+    "final": {},
+    "train": {"random_state": 0},
+    "cv": {"alpha": 1.0, "n_splits": 5, "random_state": 0},
+}
+
+def _scrape(ids_csv, college_df, page_cache, base_url, max_workers, requests_per_second):
+    '''
+    Scrapes every university of the IPEDS ID csv into the scraped dataset.
+    '''
+    from .concurrent_scraper import BASE_URL
+    from .page_cache import PageCache
+    from .scrape import stream_college_results_online
+
+    with PageCache(page_cache) as cache:
+        stream_college_results_online(college_df, ids_csv, max_workers, requests_per_second,
+                                      base_url or BASE_URL, cache=cache)
+
+def _clean(college_df, cleaned_df):
+    '''
+    Drops the unwanted universities and columns of the scraped dataset.
+    '''
+    from .clean import clean_college_dataframe
+    from .dataset_store import read_dataset, write_dataset
+
+    write_dataset(clean_college_dataframe(read_dataset(college_df)), cleaned_df)
+
+def _impute(cleaned_df, imputed_df, imputation_stats, strategy):
+    '''
+    Fills in missing GPA and test scores, saving the imputation statistics.
+    '''
+    from .clean import clean_missing_test_scores
+    from .dataset_store import read_dataset, write_dataset
+    from .imputation import save_imputation_stats
+
+    college_df, stats = clean_missing_test_scores(read_dataset(cleaned_df), strategy=strategy)
+    write_dataset(college_df, imputed_df)
+    save_imputation_stats(stats, imputation_stats)
+
+def _final(imputed_df, five_college_df):
+    '''
+    Adds the dummy variables and saves the final dataset.
+    '''
+    from .clean import final_data_cleaning
+    from .dataset_store import read_dataset
+
+    final_data_cleaning(read_dataset(imputed_df), five_college_df)
+
+def _train(five_college_df, imputation_stats, artifact, random_state):
+    '''
+    Fits the final model and saves its artifact.
+    '''
+    from .dataset_store import read_dataset
+    from .imputation import load_imputation_stats
+    from .train import (FEATURE_COLUMNS, TARGET_COLUMN,
+                        final_linear_regression_model_with_scaling, train_test_split_data)
+
+    x_train, x_test, y_train, y_test = train_test_split_data(
+        read_dataset(five_college_df, columns=FEATURE_COLUMNS + [TARGET_COLUMN]), random_state)
+    final_linear_regression_model_with_scaling(x_train, x_test, y_train, y_test,
+                                               load_imputation_stats(imputation_stats),
+                                               artifact)
+
+def _cv(five_college_df, cv_results, alpha, n_splits, random_state):
+    '''
+    Cross-validates the model variants and saves their mean scores over the folds.
+    '''
+    import numpy as np
+
+    from .dataset_store import read_dataset
+    from .models.cross_validation import cross_validate_variants, make_folds, model_variants
+    from .train import FEATURE_COLUMNS, TARGET_COLUMN, separate_features_and_target
+
+    x_data, y_data = separate_features_and_target(
+        read_dataset(five_college_df, columns=FEATURE_COLUMNS + [TARGET_COLUMN]))
+    results = cross_validate_variants(model_variants(alpha), x_data, y_data,
+                                      make_folds(x_data, n_splits, random_state))
+
+    summary = {name: {metric: float(np.mean([fold[metric] for fold in fold_results]))
+                      for metric in ("r2_train", "r2_val", "mse")}
+               for name, fold_results in results.items()}
+    with open(cv_results, "w", encoding="utf-8") as results_file:
+        json.dump(summary, results_file, indent=2)
+
+def pipeline_stages(paths=None, params=None, cache_dir=DEFAULT_CACHE_DIR):
+    '''
+    Returns the stages of the pipeline from the IPEDS ID csv to the model artifact and the
+    cross-validation results.
+
+    Parameters
+    ----------
+    paths : A dictionary overriding file paths of DEFAULT_PATHS and INTERMEDIATE_FILES.
+    params : A dictionary of stage name to a dictionary overriding its DEFAULT_PARAMS.
+    cache_dir : The directory of cached stage outputs, which also holds INTERMEDIATE_FILES.
+    '''
+    paths = {**DEFAULT_PATHS,
+             **{role: os.path.join(cache_dir, name) for role, name in INTERMEDIATE_FILES.items()},
+             **(paths or {})}
+    params = {name: {**defaults, **(params or {}).get(name, {})}
+              for name, defaults in DEFAULT_PARAMS.items()}
+
+    def files(*roles):
+        return {role: paths[role] for role in roles}
+
+    return [
+        Stage("scrape", _scrape, files("ids_csv"), files("college_df"), params["scrape"],
+              (".scrape", ".page_extractor", ".concurrent_scraper", ".dataset_store")),
+        Stage("clean", _clean, files("college_df"), files("cleaned_df"), params["clean"],
+              (".clean", ".dataset_store")),
+        Stage("impute", _impute, files("cleaned_df"), files("imputed_df", "imputation_stats"),
+              params["impute"], (".clean", ".imputation", ".dataset_store")),
+        Stage("final", _final, files("imputed_df"), files("five_college_df"), params["final"],
+              (".clean", ".dataset_store")),
+        Stage("train", _train, files("five_college_df", "imputation_stats"),
+              files("artifact"), params["train"],
+              (".train", ".model_artifact", ".dataset_store")),
+        Stage("cv", _cv, files("five_college_df"), files("cv_results"), params["cv"],
+              (".models.cross_validation", ".train", ".dataset_store")),
+    ]
+
+def stage_key(stage):
+    '''
+    Returns the cache key of a stage, a hash of its name, parameters and source code, the
+    source of the modules in its code and the contents of its input files.
+    '''
+    sources = [importlib.util.find_spec(module, __package__).origin for module in stage.code]
+
+    return fingerprint({"stage": stage.name, "params": stage.params,
+                        "source": inspect.getsource(stage.function)},
+                       *sources, *[stage.inputs[role] for role in sorted(stage.inputs)])
+
+def _store(stage, entry):
+    '''
+    Copies the outputs of a stage into its cache entry, replacing the entry in one rename.
+    '''
+    scratch = entry + ".tmp"
+    shutil.rmtree(scratch, ignore_errors=True)
+    os.makedirs(scratch)
+
+    recorded = {}
+    for role, path in stage.outputs.items():
+        shutil.copy2(path, os.path.join(scratch, role))
+        recorded[role] = fingerprint(path)
+    with open(os.path.join(scratch, OUTPUTS_FILE), "w", encoding="utf-8") as outputs_file:
+        json.dump(recorded, outputs_file, indent=2)
+
+    shutil.rmtree(entry, ignore_errors=True)
+    os.replace(scratch, entry)
+
+def _restore(stage, entry):
+    '''
+    Copies the outputs of a stage from its cache entry, skipping those already in place.
+    Returns whether any output was copied.
+    '''
+    with open(os.path.join(entry, OUTPUTS_FILE), encoding="utf-8") as outputs_file:
+        recorded = json.load(outputs_file)
+
+    restored = False
+    for role, path in stage.outputs.items():
+        if not os.path.exists(path) or fingerprint(path) != recorded[role]:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            shutil.copy2(os.path.join(entry, role), path)
+            restored = True
+
+    return restored
+
+def run_stage(stage, cache_dir=DEFAULT_CACHE_DIR, force=False):
+    '''
+    Runs a stage unless the cache has outputs for its key.
+
+    Returns
+    -------
+    "ran", "restored" when the outputs were copied from the cache, or "up to date" when
+    they were already in place.
+    '''
+    entry = os.path.join(cache_dir, stage.name, stage_key(stage))
+    if not force and os.path.exists(os.path.join(entry, OUTPUTS_FILE)):
+        return "restored" if _restore(stage, entry) else "up to date"
+
+    for path in stage.outputs.values():
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    stage.function(**stage.inputs, **stage.outputs, **stage.params)
+    _store(stage, entry)
+
+    return "ran"
+
+def run_pipeline(stages, cache_dir=DEFAULT_CACHE_DIR, max_workers=None, force=()):
+    '''
+    Runs the stages that are out of date, each once the stages writing its inputs are done.
+
+    Parameters
+    ----------
+    stages : A list of Stage, such as pipeline_stages.
+    cache_dir : The directory of cached stage outputs.
+    max_workers : The most stages run at the same time, one per core by default.
+    force : The names of stages to run even if their outputs are cached.
+
+    Returns
+    -------
+    A dictionary of stage name to the status returned by run_stage.
+    '''
+    producers = {}
+    for stage in stages:
+        for path in stage.outputs.values():
+            if path in producers:
+                raise ValueError(f"{path} is written by both {producers[path]} and {stage.name}")
+            producers[path] = stage.name
+
+    upstream = {}
+    for stage in stages:
+        missing = [path for path in stage.inputs.values()
+                   if path not in producers and not os.path.exists(path)]
+        if missing:
+            raise FileNotFoundError(f"{stage.name} reads {missing}, which no stage writes")
+        upstream[stage.name] = {producers[path] for path in stage.inputs.values()
+                                if path in producers}
+
+    statuses = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        running = {}
+        while len(statuses) < len(stages):
+            for stage in stages:
+                if (stage.name not in statuses and stage.name not in running.values()
+                        and upstream[stage.name] <= statuses.keys()):
+                    running[executor.submit(run_stage, stage, cache_dir,
+                                            stage.name in force)] = stage.name
+            if not running:
+                raise ValueError(f"The stages {sorted(upstream.keys() - statuses.keys())} "
+                                 f"read each other's outputs")
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                statuses[running.pop(future)] = future.result()
+
+    return {stage.name: statuses[stage.name] for stage in stages}
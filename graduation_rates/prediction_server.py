@@ -0,0 +1,220 @@
+'''
+This module serves five-year graduation rate predictions over HTTP. The model artifact is
+loaded once at startup, and concurrent requests are micro-batched so that every batch is
+scored with one matrix product. It runs on asyncio alone with no outside services.
+
+Endpoints
+---------
+POST /predict : A JSON object for one university returns {"prediction": rate}, and
+                {"institutions": [...]} or a JSON list returns {"predictions": [...]}.
+POST /peers : {"ipeds_ids": [...], "k": 20, "states": [...], "sectors": [...]} returns
+              {"peers": [...]}, the most similar universities of each, when a peer index is
+              loaded.
+GET /metrics : Request counts, batch sizes and p50/p99 latency in milliseconds.
+GET /health : {"status": "ok"} once the model is loaded.
+
+Usage: python -m graduation_rates serve [--artifact graduation_rate_model.json] [--port 8080]
+'''
+import asyncio
+import collections
+import json
+import time
+
+import numpy as np
+
+from .model_artifact import encode_features, predict_batch
+
+class LatencyRecorder:
+    '''
+    Keeps the latencies of the most recent requests and summarizes them as percentiles.
+    '''
+    def __init__(self, window=10000):
+        self.latencies_ms = collections.deque(maxlen=window)
+        self.requests = 0
+        self.errors = 0
+
+    def record(self, seconds, error=False):
+        '''
+        Records the latency of one request.
+        '''
+        self.latencies_ms.append(seconds * 1000)
+        self.requests += 1
+        self.errors += error
+
+    def summary(self):
+        '''
+        Returns the request counts and the p50/p99 latency of the recorded window.
+        '''
+        p50, p99 = (np.percentile(self.latencies_ms, [50, 99]).tolist() if self.latencies_ms
+                    else (None, None))
+
+        return {"requests": self.requests, "errors": self.errors,
+                "latency_p50_ms": p50, "latency_p99_ms": p99}
+
+class MicroBatcher:
+    '''
+    Collects the feature matrices of concurrent requests and scores them together.
+
+    Parameters
+    ----------
+    artifact : The model artifact.
+    max_batch_size : The most universities scored in one matrix product.
+    max_wait_ms : How long the first request of a batch waits for others to join it.
+    '''
+    def __init__(self, artifact, max_batch_size=4096, max_wait_ms=1.0):
+        self.artifact = artifact
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.queue = asyncio.Queue()
+        self.batches = 0
+        self.batched_rows = 0
+
+    async def predict(self, features):
+        '''
+        Queues a feature matrix and waits for its predictions.
+        '''
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((features, future))
+
+        return await future
+
+    async def run(self):
+        '''
+        Scores queued requests in batches until cancelled. When scoring a batch fails, its
+        requests receive the error and the following batches are still scored.
+        '''
+        while True:
+            pending = [await self.queue.get()]
+            if self.max_wait:
+                await asyncio.sleep(self.max_wait)
+
+            rows = len(pending[0][0])
+            while rows < self.max_batch_size and not self.queue.empty():
+                pending.append(self.queue.get_nowait())
+                rows += len(pending[-1][0])
+
+            try:
+                predictions = predict_batch(self.artifact,
+                                            np.vstack([item[0] for item in pending]))
+            except Exception as error:  # pylint: disable=broad-except
+                for _, future in pending:
+                    if not future.cancelled():
+                        future.set_exception(error)
+                continue
+
+            splits = np.cumsum([len(features) for features, _ in pending])[:-1]
+            for (_, future), batch_predictions in zip(pending, np.split(predictions, splits)):
+                if not future.cancelled():
+                    future.set_result(batch_predictions)
+
+            self.batches += 1
+            self.batched_rows += rows
+
+class PredictionServer:
+    '''
+    A minimal HTTP/1.1 server with keep-alive connections around a MicroBatcher, and an
+    optional PeerIndex for peer lookups.
+    '''
+    def __init__(self, artifact, max_batch_size=4096, max_wait_ms=1.0, peer_index=None):
+        self.artifact = artifact
+        self.peer_index = peer_index
+        self.batcher = MicroBatcher(artifact, max_batch_size, max_wait_ms)
+        self.latency = LatencyRecorder()
+
+    async def route(self, method, path, body):
+        '''
+        Returns the status line and JSON payload for one request.
+        '''
+        if method == "GET" and path == "/health":
+            return "200 OK", {"status": "ok"}
+
+        if method == "GET" and path == "/metrics":
+            batches = self.batcher.batches
+            return "200 OK", {**self.latency.summary(), "batches": batches,
+                              "mean_batch_rows": self.batcher.batched_rows / batches
+                                                 if batches else None}
+
+        if method == "POST" and path == "/predict":
+            payload = json.loads(body)
+            single = isinstance(payload, dict) and "institutions" not in payload
+            records = ([payload] if single
+                       else payload["institutions"] if isinstance(payload, dict) else payload)
+
+            predictions = await self.batcher.predict(encode_features(self.artifact, records))
+
+            if single:
+                return "200 OK", {"prediction": float(predictions[0])}
+            return "200 OK", {"predictions": predictions.tolist()}
+
+        if method == "POST" and path == "/peers" and self.peer_index is not None:
+            payload = json.loads(body)
+            peers_df = self.peer_index.peers(payload["ipeds_ids"], payload.get("k", 20),
+                                             payload.get("states"), payload.get("sectors"))
+            return "200 OK", {"peers": peers_df.to_dict(orient="records")}
+
+        return "404 Not Found", {"error": f"No route for {method} {path}"}
+
+    async def respond(self, writer, status, payload):
+        '''
+        Writes one response with a JSON payload.
+        '''
+        data = json.dumps(payload).encode()
+        writer.write(f"HTTP/1.1 {status}\r\nContent-Type: application/json\r\n"
+                     f"Content-Length: {len(data)}\r\n\r\n".encode() + data)
+        await writer.drain()
+
+    async def handle_connection(self, reader, writer):
+        '''
+        Serves requests on one connection until the client closes it.
+        '''
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                try:
+                    method, path, _ = request_line.decode("latin-1").split()
+                except ValueError:
+                    await self.respond(writer, "400 Bad Request",
+                                       {"error": "Malformed request line"})
+                    break
+
+                headers = {}
+                while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+
+                started = time.perf_counter()
+                try:
+                    status, payload = await self.route(method, path, body)
+                except (ValueError, KeyError, TypeError) as error:
+                    status, payload = "400 Bad Request", {"error": str(error)}
+                except Exception as error:  # pylint: disable=broad-except
+                    status, payload = "500 Internal Server Error", {"error": str(error)}
+                if path == "/predict":
+                    self.latency.record(time.perf_counter() - started,
+                                        error=not status.startswith("200"))
+
+                await self.respond(writer, status, payload)
+
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host="127.0.0.1", port=8080):
+        '''
+        Starts the batcher and serves HTTP until cancelled.
+        '''
+        batcher_task = asyncio.create_task(self.batcher.run())
+        server = await asyncio.start_server(self.handle_connection, host, port)
+
+        print(f'Serving predictions on http://{host}:{port}')
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            batcher_task.cancel()
@@ -0,0 +1,109 @@
+'''
+This module re-derives the scraped dataframe from the profile pages archived in a PageCache,
+without touching the network, for when the fields read by extract_college_fields change.
+Compressed page bodies are read from the archive in chunks, decompressed and parsed with lxml
+in a pool of worker processes, and joined to the IPEDS ID csv in order and streamed into the
+dataset store in batches, as stream_college_results_online does.
+'''
+import zlib
+from collections import deque
+
+from joblib import Parallel, delayed
+
+from .dataset_store import ID_COLUMN, DatasetWriter
+from .instrumentation import count, instrumented_stage
+from .page_extractor import PARSE_ERRORS, extract_college_fields, is_valid_college_dict
+from .scrape import IPEDS_IDS_CSV, iter_ipeds_ids, read_id_columns, scraped_schema
+
+# Archived bodies may also fail to decompress
+ARCHIVE_ERRORS = (*PARSE_ERRORS, zlib.error)
+
+def parse_archived_pages(pages):
+    '''
+    Decompresses and parses a chunk of archived pages.
+
+    Parameters
+    ----------
+    pages : A list of (IPEDS ID, zlib-compressed page body) pairs.
+
+    Returns
+    -------
+    A list of the dictionaries from extract_college_fields, with None for the pages that
+    fail to parse.
+    '''
+    college_dicts = []
+    for ipeds_id, body in pages:
+        try:
+            college_dicts.append(extract_college_fields(zlib.decompress(body).decode("utf-8"),
+                                                        ipeds_id))
+        except ARCHIVE_ERRORS:
+            college_dicts.append(None)
+
+    return college_dicts
+
+def _chunks(rows, chunk_size):
+    '''
+    Yields lists of chunk_size items of an iterable, and the remainder.
+    '''
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+@instrumented_stage()
+def reparse_archive(cache, path, ids_csv=IPEDS_IDS_CSV, n_jobs=-1, chunk_pages=64,
+                    batch_rows=1000):
+    '''
+    Parses the archived page of every university of the IPEDS ID csv into a Parquet file,
+    with the same columns as stream_college_results_online.
+
+    Parameters
+    ----------
+    cache : The PageCache the pages were archived in.
+    path : The Parquet file to write.
+    ids_csv : The csv file of universities and their IPEDS IDs.
+    n_jobs : The number of worker processes, -1 for one per core.
+    chunk_pages : The number of pages sent to a worker at a time.
+    batch_rows : The number of rows written to the file at a time.
+
+    Returns
+    -------
+    The number of universities written to the file.
+    '''
+    # Chunks are parsed in order, so each is joined to the oldest waiting csv rows
+    waiting_rows = deque()
+    rows_missing = 0
+
+    def archived_chunks():
+        nonlocal rows_missing
+        for id_rows in _chunks(iter_ipeds_ids(ids_csv), chunk_pages):
+            bodies = cache.compressed_bodies(id_row[ID_COLUMN] for id_row in id_rows)
+            archived = [id_row for id_row in id_rows if id_row[ID_COLUMN] in bodies]
+            rows_missing += len(id_rows) - len(archived)
+
+            waiting_rows.append(archived)
+            yield [(id_row[ID_COLUMN], bodies[id_row[ID_COLUMN]]) for id_row in archived]
+
+    parsed_chunks = Parallel(n_jobs=n_jobs, return_as="generator")(
+        delayed(parse_archived_pages)(pages) for pages in archived_chunks())
+
+    id_columns = read_id_columns(ids_csv)
+    rows_failed = rows_invalid = 0
+    with DatasetWriter(path, scraped_schema(id_columns), batch_rows) as writer:
+        for college_dicts in parsed_chunks:
+            for id_row, college_dict in zip(waiting_rows.popleft(), college_dicts):
+                if college_dict is None:
+                    rows_failed += 1
+                elif not is_valid_college_dict(college_dict):
+                    rows_invalid += 1
+                else:
+                    writer.append({**id_row, **college_dict})
+
+    count("rows_reparsed", writer.rows_written, stage="reparse_archive",
+          rows_missing=rows_missing, rows_failed=rows_failed, rows_invalid=rows_invalid)
+
+    return writer.rows_written
@@ -0,0 +1,184 @@
+'''
+This module simulates policy scenarios, such as every university raising its retention rate
+by 5 points or doubling its tuition, over all universities at once. A scenario is a small
+JSON-able dictionary of changes to feature columns:
+
+    {"name": "retention +5", "add": {"retention_rate": 5}}
+    {"name": "tuition x2", "multiply": {"out_state_tuition": 2}}
+    {"name": "test optional", "set": {"admission_test_Required": 0}}
+
+The changes of all scenarios are compiled into per-feature multiply, add and set arrays, the
+(scenario, university, feature) array of every block of scenarios is built by broadcasting
+the base feature matrix against them, and it is scored in one matrix product with the saved
+model. Changes in predicted graduation rates are then averaged per group, such as state.
+'''
+import numpy as np
+import pandas as pd
+
+from .model_artifact import predict_batch
+
+# Percentages stay between 0 and 100 and dummy variables between 0 and 1
+DEFAULT_BOUNDS = {"percent_admitted": (0, 100), "percent_part_time": (0, 100),
+                  "pell_percent": (0, 100), "retention_rate": (0, 100)}
+
+def scenario_grid(column, operation, values, name=None):
+    '''
+    Returns one scenario per value, changing one column with "add", "multiply" or "set",
+    e.g. scenario_grid("retention_rate", "add", range(1, 11)).
+    '''
+    name = name or f"{column} {operation} {{}}"
+
+    return [{"name": name.format(value), operation: {column: value}} for value in values]
+
+def compile_scenarios(scenarios, feature_columns):
+    '''
+    Turns scenario dictionaries into arrays over the feature columns.
+
+    Parameters
+    ----------
+    scenarios : A list of dictionaries with a name and any of "multiply", "add" and "set",
+                each a dictionary of feature column to value. A column is multiplied before
+                it is added to, and "set" overrides both.
+    feature_columns : The names of the features in model order.
+
+    Returns
+    -------
+    A dictionary of the scenario names and (n_scenarios, n_features) arrays multiply, add,
+    set_mask and set_values.
+    '''
+    shape = (len(scenarios), len(feature_columns))
+    compiled = {"names": [], "multiply": np.ones(shape), "add": np.zeros(shape),
+                "set_mask": np.zeros(shape, dtype=bool), "set_values": np.zeros(shape)}
+    index = {column: position for position, column in enumerate(feature_columns)}
+
+    for row, scenario in enumerate(scenarios):
+        unknown = set(scenario) - {"name", "multiply", "add", "set"}
+        if unknown:
+            raise ValueError(f"Unknown scenario keys: {sorted(unknown)}")
+        compiled["names"].append(scenario.get("name", f"scenario {row}"))
+
+        for operation, target in (("multiply", "multiply"), ("add", "add"),
+                                  ("set", "set_values")):
+            for column, value in scenario.get(operation, {}).items():
+                if column not in index:
+                    raise ValueError(f"Unknown feature column in scenario "
+                                     f"{compiled['names'][-1]}: {column}")
+                compiled[target][row, index[column]] = value
+                if operation == "set":
+                    compiled["set_mask"][row, index[column]] = True
+
+    return compiled
+
+def feature_bounds(feature_columns, bounds=None):
+    '''
+    Returns the lower and upper bound arrays of the feature columns, with dummy variables
+    bounded by 0 and 1 and every other unbounded column by -inf and inf.
+    '''
+    bounds = {**DEFAULT_BOUNDS, **(bounds or {})}
+    lower = np.full(len(feature_columns), -np.inf)
+    upper = np.full(len(feature_columns), np.inf)
+
+    for position, column in enumerate(feature_columns):
+        if column in bounds:
+            lower[position], upper[position] = bounds[column]
+        elif column.startswith(("sector_", "admission_test_")):
+            lower[position], upper[position] = 0, 1
+
+    return lower, upper
+
+def scenario_features(base_features, compiled, lower=None, upper=None):
+    '''
+    Builds the feature array of every compiled scenario.
+
+    Parameters
+    ----------
+    base_features : The (n_universities, n_features) base feature matrix.
+    compiled : The output of compile_scenarios, or a block of its scenarios.
+    lower, upper : Optional bounds each feature is clipped to.
+
+    Returns
+    -------
+    features : An array of shape (n_scenarios, n_universities, n_features).
+    '''
+    features = base_features[None, :, :] * compiled["multiply"][:, None, :]
+    features += compiled["add"][:, None, :]
+    if compiled["set_mask"].any():
+        np.copyto(features, compiled["set_values"][:, None, :],
+                  where=compiled["set_mask"][:, None, :])
+
+    # Clip only the bounded columns, in place
+    if lower is not None:
+        for position in np.flatnonzero(np.isfinite(lower) | np.isfinite(upper)):
+            np.clip(features[:, :, position], lower[position], upper[position],
+                    out=features[:, :, position])
+
+    return features
+
+def run_scenarios(artifact, base_features, scenarios, groups=None, bounds=None,
+                  block_size=64):
+    '''
+    Predicts every scenario for every university and averages the changes per group.
+
+    Parameters
+    ----------
+    artifact : The model artifact.
+    base_features : The (n_universities, n_features) base feature matrix, such as the output
+                    of encode_features.
+    scenarios : A list of scenario dictionaries, see compile_scenarios.
+    groups : An optional label per university, such as its state, to aggregate by. All
+             universities are one group, "all", by default.
+    bounds : A dictionary of feature column to the (lower, upper) bounds its changed values
+             are clipped to, added to DEFAULT_BOUNDS.
+    block_size : The number of scenarios whose feature arrays are built at once.
+
+    Returns
+    -------
+    A dataframe with one row per scenario and group of the number of universities, the mean
+    base and scenario predictions and the mean change in predicted graduation rate.
+    '''
+    base_features = np.asarray(base_features, dtype=float)
+    compiled = compile_scenarios(scenarios, artifact["feature_columns"])
+    lower, upper = feature_bounds(artifact["feature_columns"], bounds)
+
+    # A group membership matrix turns the per-university sums into per-group sums
+    if groups is None:
+        groups = np.full(len(base_features), "all")
+    codes, labels = pd.factorize(np.asarray(groups), sort=True)
+    membership = np.zeros((len(base_features), len(labels)))
+    membership[np.arange(len(base_features)), codes] = 1
+    group_sizes = membership.sum(axis=0)
+
+    base_means = predict_batch(artifact, base_features) @ membership / group_sizes
+
+    scenario_means = np.empty((len(scenarios), len(labels)))
+    for start in range(0, len(scenarios), block_size):
+        block = {key: values[start:start + block_size] for key, values in compiled.items()}
+        predictions = predict_batch(artifact, scenario_features(base_features, block, lower,
+                                                                upper))
+        scenario_means[start:start + block_size] = predictions @ membership / group_sizes
+
+    # Categorical codes avoid repeating the scenario and group names row by row
+    name_codes, names = pd.factorize(np.asarray(compiled["names"], dtype=object))
+    results = pd.DataFrame({
+        "scenario": pd.Categorical.from_codes(np.repeat(name_codes, len(labels)), names),
+        "group": pd.Categorical.from_codes(np.tile(np.arange(len(labels)), len(scenarios)),
+                                           labels),
+        "n_universities": np.tile(group_sizes.astype(int), len(scenarios)),
+        "base_prediction": np.tile(base_means, len(scenarios)),
+        "scenario_prediction": scenario_means.ravel()})
+    results["delta"] = results["scenario_prediction"] - results["base_prediction"]
+
+    return results
+
+def sector_labels(college_df, base_sector="Private not-for-profit"):
+    '''
+    Returns the sector of every university from its sector dummy variables, with the level
+    dropped by final_data_cleaning as base_sector.
+    '''
+    dummy_columns = [column for column in college_df.columns if column.startswith("sector_")]
+    levels = np.array([base_sector] + [column[len("sector_"):] for column in dummy_columns])
+
+    # Every row has at most one dummy set, so its position is a code into levels
+    codes = college_df[dummy_columns].to_numpy() @ np.arange(1, len(dummy_columns) + 1)
+
+    return pd.Series(levels[codes.astype(int)], index=college_df.index)
@@ -0,0 +1,208 @@
+'''
+This module connects to College Results Online's website and uses lxml to scrape
+data from more than 1,600 public and private 4-year univerisities in the US. The data is then
+put into a dataframe, or streamed to a Parquet file in fixed-size batches so that memory does
+not grow with the number of universities.
+'''
+from collections import deque
+
+import requests
+import pandas as pd
+import pyarrow as pa
+
+from .concurrent_scraper import BASE_URL, iter_scrape, scrape_concurrently
+from .dataset_store import ID_COLUMN, DatasetWriter, normalize_id_columns
+from .instrumentation import count, http_summary, instrumented_stage
+from .page_extractor import (COLLEGE_FIELDS, extract_college_fields, is_valid_college_dict,
+                             parse_text)
+
+IPEDS_IDS_CSV = "Data/4-Year-Public-and-Private-Universities-and-IPEDS-IDs.csv"
+
+def read_id_columns(path=IPEDS_IDS_CSV):
+    '''
+    Returns the normalized column names of the IPEDS ID csv.
+    '''
+    return normalize_id_columns(pd.read_csv(path, nrows=0).columns)
+
+@instrumented_stage()
+def get_school_id_links(path=IPEDS_IDS_CSV):
+    '''
+    A helper function that loads in a csv file with universities and their unique
+    links in order to webscrape data about them.
+
+    Parameters
+    ----------
+    path : The csv file of universities and their IPEDS IDs.
+
+    Returns
+    -------
+    A list of links to use and a college_df with the name of the university.
+    '''
+    # Load in csv with unviersities and IPEDS ID
+    college_df = pd.read_csv(path)
+    college_df.columns = normalize_id_columns(college_df.columns)
+
+    # Convert ipeds_id column to string
+    college_df[ID_COLUMN] = college_df[ID_COLUMN].apply(str)
+
+    # Saves the ID links
+    links_to_follow = college_df[ID_COLUMN]
+
+    return links_to_follow, college_df
+
+def get_college_dict(link):
+    '''
+    Creates a dictionary of the categories of scraped data for each university
+
+    Parameters
+    ----------
+    id_link : The unique part of the link for one university.
+
+    Returns
+    -------
+    A dictionary of scraped data for each of the univerisities.
+    '''
+    #Create full URL to scrape
+    url = BASE_URL + link
+
+    #Request HTML and parse
+    response = requests.get(url)
+
+    return extract_college_fields(response.text, link)
+
+@instrumented_stage()
+def scrape_college_results_online(links_to_follow, college_df, max_workers=8,
+                                  requests_per_second=5, base_url=BASE_URL, cache=None,
+                                  journal=None, max_age_days=None):
+    '''
+    Returns a dataframe with information scraped from College Results Online.
+
+    Parameters
+    ----------
+    links_to_follow : The list of unique parts of the links for the univerisities.
+    college_df : A dataframe with the names of univerisities and their id_links
+    max_workers : The number of profile pages fetched at the same time.
+    requests_per_second : The maximum request rate to the website, or None for no limit.
+    base_url : The URL each link is appended to.
+    cache : An optional PageCache of previously downloaded profile pages.
+    journal : An optional ScrapeJournal. Only universities missing from the journal, or
+              older than max_age_days, are scraped and the rest are read from the journal.
+    max_age_days : The age after which a journaled university is scraped again.
+
+    Returns
+    -------
+    A dataframe containing the information for univerisities.
+    '''
+    pending_links = (journal.pending(links_to_follow, max_age_days) if journal is not None
+                     else links_to_follow)
+
+    college_id_list = scrape_concurrently(pending_links, extract_college_fields,
+                                          base_url=base_url, max_workers=max_workers,
+                                          requests_per_second=requests_per_second,
+                                          cache=cache, journal=journal)
+
+    http_summary()
+
+    if journal is not None:
+        college_id_list = journal.college_dicts(links_to_follow)
+
+    college_page_info = pd.DataFrame(college_id_list)
+    college_page_info.set_index('ipeds_id', inplace=True)
+
+    # Reset the index for the college-df
+    college_df.set_index('ipeds_id', inplace=True)
+
+    # Merge the 2 dataframes
+    college_df = college_df.merge(college_page_info, left_index=True, right_index=True)
+
+    # Reset the index of the dataframe
+    college_df = college_df.reset_index()
+
+    return college_df
+
+def scraped_schema(id_columns):
+    '''
+    Returns the pyarrow schema of the scraped universities, with the columns of the IPEDS ID
+    csv followed by the college name and the fields of COLLEGE_FIELDS, in the compact dtypes
+    of write_dataset.
+    '''
+    fields = [(ID_COLUMN, pa.int32())]
+    fields += [(column, pa.string()) for column in normalize_id_columns(id_columns)
+               if column != ID_COLUMN]
+    fields.append(("college_name", pa.string()))
+
+    for name, _, parser in COLLEGE_FIELDS:
+        if name == "state":
+            fields.append((name, pa.dictionary(pa.int32(), pa.string())))
+        else:
+            fields.append((name, pa.string() if parser is parse_text else pa.float32()))
+
+    return pa.schema(fields)
+
+def iter_ipeds_ids(path=IPEDS_IDS_CSV, chunk_rows=10_000):
+    '''
+    Yields one dictionary per university of the IPEDS ID csv, with every value a string and
+    the ID under ID_COLUMN, reading chunk_rows rows of the csv at a time.
+    '''
+    for chunk in pd.read_csv(path, dtype=str, chunksize=chunk_rows):
+        chunk.columns = normalize_id_columns(chunk.columns)
+        yield from chunk.to_dict("records")
+
+@instrumented_stage()
+def stream_college_results_online(path, ids_csv=IPEDS_IDS_CSV, max_workers=8,
+                                  requests_per_second=5, base_url=BASE_URL, cache=None,
+                                  journal=None, max_age_days=None, batch_rows=1000):
+    '''
+    Scrapes every university of the IPEDS ID csv into a Parquet file as a pipeline of
+    generators: csv rows are read in chunks, pages are fetched and parsed on a bounded
+    window of threads, parsed pages are validated and each is joined to its csv row as it
+    arrives, and rows are written in batches of batch_rows.
+
+    Parameters
+    ----------
+    path : The Parquet file to write.
+    ids_csv : The csv file of universities and their IPEDS IDs.
+    max_workers : The number of profile pages fetched at the same time.
+    requests_per_second : The maximum request rate to the website, or None for no limit.
+    base_url : The URL each link is appended to.
+    cache : An optional PageCache of previously downloaded profile pages.
+    journal : An optional ScrapeJournal. Universities in the journal that are not older
+              than max_age_days are read from it instead of being scraped.
+    max_age_days : The age after which a journaled university is scraped again.
+    batch_rows : The number of rows written to the file at a time.
+
+    Returns
+    -------
+    The number of universities written to the file.
+    '''
+    # Results come back in csv order, so each one is joined to the oldest waiting csv row
+    waiting_rows = deque()
+
+    def links_to_follow():
+        for id_row in iter_ipeds_ids(ids_csv):
+            waiting_rows.append(id_row)
+            yield id_row[ID_COLUMN]
+
+    replay = ((lambda link: journal.replay(link, max_age_days)) if journal is not None
+              else None)
+    results = iter_scrape(links_to_follow(), extract_college_fields, base_url=base_url,
+                          max_workers=max_workers, requests_per_second=requests_per_second,
+                          cache=cache, journal=journal, replay=replay)
+
+    id_columns = read_id_columns(ids_csv)
+    rows_failed = rows_invalid = 0
+    with DatasetWriter(path, scraped_schema(id_columns), batch_rows) as writer:
+        for _, college_dict in results:
+            id_row = waiting_rows.popleft()
+            if college_dict is None:
+                rows_failed += 1
+            elif not is_valid_college_dict(college_dict):
+                rows_invalid += 1
+            else:
+                writer.append({**id_row, **college_dict})
+
+    http_summary()
+    count("rows_scraped", writer.rows_written, stage="stream_college_results_online",
+          rows_failed=rows_failed, rows_invalid=rows_invalid)
+
+    return writer.rows_written
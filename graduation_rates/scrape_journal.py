@@ -0,0 +1,94 @@
+'''
+This module keeps a durable journal of scraped universities so that an interrupted scrape
+can resume where it stopped. Every parsed college_dict is appended to a JSON Lines file and
+flushed to disk straight away; re-runs only fetch the IPEDS IDs that are missing from the
+journal or older than a chosen age.
+'''
+import json
+import os
+import threading
+import time
+
+class ScrapeJournal:
+    '''
+    An append-only JSON Lines journal of college_dicts keyed by IPEDS ID. Later lines for
+    the same IPEDS ID replace earlier ones, and a final line cut short by a crash is ignored.
+
+    Parameters
+    ----------
+    path : The journal file, created if it does not exist.
+    '''
+    def __init__(self, path="scrape_journal.jsonl"):
+        self.path = path
+        self.records = {}
+        self._lock = threading.Lock()
+        line = ""
+
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as journal_file:
+                for line in journal_file:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    self.records[record["college_dict"]["ipeds_id"]] = record
+
+        self._file = open(path, "a", encoding="utf-8")  # pylint: disable=consider-using-with
+
+        # Start on a new line if the last write was cut short
+        if self._file.tell() and not line.endswith("\n"):
+            self._file.write("\n")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        '''
+        Closes the journal file.
+        '''
+        self._file.close()
+
+    def pending(self, links_to_follow, max_age_days=None):
+        '''
+        Returns the links that are missing from the journal, or that were scraped more than
+        max_age_days ago when max_age_days is given.
+        '''
+        oldest = time.time() - max_age_days * 86400 if max_age_days is not None else None
+
+        return [link for link in links_to_follow
+                if link not in self.records
+                or (oldest is not None and self.records[link]["scraped_at"] < oldest)]
+
+    def replay(self, link, max_age_days=None):
+        '''
+        Returns the journaled college_dict of a link, or None if it is missing from the
+        journal or was scraped more than max_age_days ago when max_age_days is given.
+        '''
+        record = self.records.get(link)
+        if record is None or (max_age_days is not None
+                              and record["scraped_at"] < time.time() - max_age_days * 86400):
+            return None
+
+        return record["college_dict"]
+
+    def append(self, college_dict):
+        '''
+        Writes one college_dict to the end of the journal and syncs it to disk.
+        '''
+        record = {"scraped_at": time.time(), "college_dict": college_dict}
+
+        with self._lock:
+            self._file.write(json.dumps(record) + "\n")
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self.records[college_dict["ipeds_id"]] = record
+
+    def college_dicts(self, links_to_follow):
+        '''
+        Returns the journaled college_dicts of the links, in order, skipping missing links.
+        '''
+        return [self.records[link]["college_dict"] for link in links_to_follow
+                if link in self.records]
@@ -0,0 +1,191 @@
+'''
+This module trains the final Linear Regression model with standard scaling out of core. The
+dataset is read in batches and each batch only updates running statistics: the count, the
+means and the centered cross products of the features and target, merged with Chan's
+parallel update so that they stay accurate over tens of millions of rows. The scaler, the
+coefficients and the train and test scores all come from these statistics, which give the
+same model as fitting StandardScaler and LinearRegression on the rows in memory.
+'''
+from types import SimpleNamespace
+
+import numpy as np
+
+from .instrumentation import count, instrumented_stage
+from .model_artifact import build_artifact, save_artifact
+
+class RunningStatistics:
+    '''
+    The count, means and centered cross products of a stream of feature and target rows.
+
+    Parameters
+    ----------
+    n_features : The number of feature columns.
+    '''
+    def __init__(self, n_features):
+        self.n_rows = 0
+        self.x_mean = np.zeros(n_features)
+        self.y_mean = 0.0
+        self.xx = np.zeros((n_features, n_features))
+        self.xy = np.zeros(n_features)
+        self.yy = 0.0
+
+    def update(self, x_block, y_block):
+        '''
+        Adds a block of rows to the statistics.
+        '''
+        x_block = np.asarray(x_block, dtype=float)
+        y_block = np.asarray(y_block, dtype=float)
+        if not len(y_block):
+            return
+
+        block = RunningStatistics(x_block.shape[1])
+        block.n_rows = len(y_block)
+        block.x_mean = x_block.mean(axis=0)
+        block.y_mean = y_block.mean()
+        x_centered = x_block - block.x_mean
+        y_centered = y_block - block.y_mean
+        block.xx = x_centered.T @ x_centered
+        block.xy = x_centered.T @ y_centered
+        block.yy = y_centered @ y_centered
+
+        self.merge(block)
+
+    def merge(self, other):
+        '''
+        Adds the rows summarized by other RunningStatistics to these statistics.
+        '''
+        n_rows = self.n_rows + other.n_rows
+        if not other.n_rows:
+            return
+
+        # Each cross product gains the spread between the two means
+        weight = self.n_rows * other.n_rows / n_rows
+        x_delta = other.x_mean - self.x_mean
+        y_delta = other.y_mean - self.y_mean
+
+        self.xx += other.xx + weight * np.outer(x_delta, x_delta)
+        self.xy += other.xy + weight * x_delta * y_delta
+        self.yy += other.yy + weight * y_delta ** 2
+        self.x_mean += x_delta * other.n_rows / n_rows
+        self.y_mean += y_delta * other.n_rows / n_rows
+        self.n_rows = n_rows
+
+    def x_std(self):
+        '''
+        Returns the population standard deviation of every feature, as StandardScaler does.
+        '''
+        return np.sqrt(np.diag(self.xx) / self.n_rows)
+
+    def sse(self, coef, intercept):
+        '''
+        Returns the residual sum of squares of a linear model over the summarized rows.
+        '''
+        offset = self.y_mean - self.x_mean @ coef - intercept
+
+        return (self.yy - 2 * coef @ self.xy + coef @ self.xx @ coef
+                + self.n_rows * offset ** 2)
+
+def fit_running_statistics(stats):
+    '''
+    Solves the least squares normal equations from the statistics of the training rows.
+
+    Parameters
+    ----------
+    stats : The RunningStatistics of the training rows.
+
+    Returns
+    -------
+    linear_regression, scaler : The fitted model on standard scaled features and the scaler,
+    with the attributes build_artifact reads from LinearRegression and StandardScaler.
+    '''
+    x_std = stats.x_std()
+    scale = np.where(x_std == 0, 1.0, x_std)
+
+    # Solving on the scaled Gram matrix keeps it well conditioned
+    scaled_xx = stats.xx / np.outer(scale, scale)
+    coef_scaled = np.linalg.lstsq(scaled_xx, stats.xy / scale, rcond=None)[0]
+
+    scaler = SimpleNamespace(mean_=stats.x_mean.copy(), scale_=scale, var_=x_std ** 2,
+                             n_samples_seen_=stats.n_rows)
+    linear_regression = SimpleNamespace(coef_=coef_scaled, intercept_=stats.y_mean)
+
+    return linear_regression, scaler
+
+def split_batches(batches, feature_columns, target_column, test_size=.2, random_state=None):
+    '''
+    Accumulates the training and test statistics of batches of the final dataset, putting
+    each row in the test set with probability test_size.
+
+    Parameters
+    ----------
+    batches : An iterable of dataframes with the feature and target columns.
+    feature_columns : The names of the features in model order.
+    target_column : The name of the target.
+    test_size : The share of rows held out for testing.
+    random_state : The seed of the split, so that a stream is always split the same way.
+
+    Returns
+    -------
+    train_stats, test_stats : The RunningStatistics of the training and test rows.
+    '''
+    rng = np.random.default_rng(random_state)
+    train_stats = RunningStatistics(len(feature_columns))
+    test_stats = RunningStatistics(len(feature_columns))
+
+    for batch in batches:
+        x_block = batch[feature_columns].to_numpy(dtype=float)
+        y_block = batch[target_column].to_numpy(dtype=float)
+        is_test = rng.random(len(y_block)) < test_size
+
+        train_stats.update(x_block[~is_test], y_block[~is_test])
+        test_stats.update(x_block[is_test], y_block[is_test])
+
+    count("rows_streamed", train_stats.n_rows + test_stats.n_rows,
+          stage="streaming_linear_regression", rows_train=train_stats.n_rows,
+          rows_test=test_stats.n_rows)
+
+    return train_stats, test_stats
+
+@instrumented_stage()
+def streaming_linear_regression(batches, feature_columns, target_column, imputation_stats=None,
+                                artifact_path='graduation_rate_model.json', test_size=.2,
+                                random_state=None):
+    '''
+    Models batches of the final dataset using a linear regression model with standard scaling
+    without holding more than one batch in memory. Prints train and test r2 and mse, as
+    final_linear_regression_model_with_scaling does, and saves the model artifact.
+
+    Parameters
+    ----------
+    batches : An iterable of dataframes with the feature and target columns, such as the
+              output of iter_dataset or iter_panel.
+    feature_columns : The names of the features in model order.
+    target_column : The name of the target.
+    imputation_stats : The statistics from fit_admission_rate_imputer, or None.
+    artifact_path : The JSON file the artifact is saved to.
+    test_size : The share of rows held out for testing.
+    random_state : The seed of the train and test split.
+
+    Returns
+    -------
+    artifact : The saved model artifact.
+    '''
+    train_stats, test_stats = split_batches(batches, feature_columns, target_column, test_size,
+                                            random_state)
+    linear_regression, scaler = fit_running_statistics(train_stats)
+    artifact = build_artifact(linear_regression, scaler, feature_columns, imputation_stats)
+
+    r2_train = 1 - train_stats.sse(artifact["coef"], artifact["intercept"]) / train_stats.yy
+    mse = test_stats.sse(artifact["coef"], artifact["intercept"]) / test_stats.n_rows
+    r2_test = 1 - mse * test_stats.n_rows / test_stats.yy
+
+    # Print model results
+    print('Linear Regression Results with Scaling:\n'
+          f'R^2 Train: {r2_train},\n'
+          f'R^2 Test: {r2_test},\n'
+          f'MSE: {mse}')
+
+    # Save the model artifact
+    save_artifact(artifact, artifact_path)
+
+    return artifact
@@ -1,43 +1,54 @@
 '''
-This scripts loads the date_data and uses a Linear Regression model with standard scaling
+This module loads the date_data and uses a Linear Regression model with standard scaling
 to predict university graduation rates.
 '''
-import pickle
-import pandas as pd
 
 from sklearn.linear_model import LinearRegression
 from sklearn.metrics import mean_squared_error
 from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import StandardScaler
 
+from .instrumentation import instrumented_stage
+from .model_artifact import build_artifact, save_artifact
+
+FEATURE_COLUMNS = ["percent_admitted", "out_state_tuition", "average_gpa", "percent_part_time",
+                   "median_act_composite", "pell_percent", "retention_rate",
+                   "admission_test_Required"]
+TARGET_COLUMN = "five_year_grad_rate"
+
 def separate_features_and_target(dataframe):
     '''
     Returns 2 dataframes where features contains only the features for the
     model and target contains the targets.
     '''
 
-    features_grad_rate = dataframe.drop('five_year_grad_rate', axis=1)
-    target_grad_rate = dataframe['five_year_grad_rate']
+    features_grad_rate = dataframe.drop(TARGET_COLUMN, axis=1)
+    target_grad_rate = dataframe[TARGET_COLUMN]
 
     return features_grad_rate, target_grad_rate
 
-def train_test_split_data(five_college_df):
+@instrumented_stage()
+def train_test_split_data(five_college_df, random_state=None):
     '''
-    Return train and test dataframes.
+    Return train and test dataframes, split with the seed random_state.
     '''
 
     feature_grad_rate, target_grad_rate = separate_features_and_target(five_college_df)
 
     x_train, x_test, y_train, y_test = train_test_split(feature_grad_rate, target_grad_rate,
-                                                        test_size=.2)
+                                                        test_size=.2, random_state=random_state)
 
     return x_train, x_test, y_train, y_test
 
-def final_linear_regression_model_with_scaling(x_train, x_test, y_train, y_test):
+@instrumented_stage()
+def final_linear_regression_model_with_scaling(x_train, x_test, y_train, y_test,
+                                               imputation_stats=None,
+                                               artifact_path='graduation_rate_model.json'):
     '''
     Takes in a dataframe and calls other functions to split the data into train and test sets.
     Models data using a linear regression model with standard scaling to predict university
-    graduation rates. Prints train and test r2 and mse. Pickles the model for future use.
+    graduation rates. Prints train and test r2 and mse. Saves the model, its scaling and the
+    imputation statistics as one artifact for future use.
     '''
     scaler = StandardScaler()
     x_train_scaled = scaler.fit_transform(x_train.values)
@@ -57,22 +68,6 @@ def final_linear_regression_model_with_scaling(x_train, x_test, y_train, y_test)
           f'R^2 Test: {r2_test},\n'
           f'MSE: {mse}')
 
-    # Pickle model
-    with open('linear_regression.pkl', 'wb') as f:
-        pickle.dump(linear_regression, f)
-
-def main():
-    '''
-    Loads in the date_data, separates the features and target, separates the data
-    into train-test-split, and uses a Linear Regression model with standard scaling.
-    Prints the results and pickles the model.
-    '''
-
-    # Load in data
-    five_college_df = pd.read_csv('five_college_df.csv')
-
-    # Call internal functions to this script
-    x_train, x_test, y_train, y_test = train_test_split_data(five_college_df)
-    final_linear_regression_model_with_scaling(x_train, x_test, y_train, y_test)
-
-main()
+    # Save the model artifact
+    artifact = build_artifact(linear_regression, scaler, list(x_train.columns), imputation_stats)
+    save_artifact(artifact, artifact_path)
@@ -0,0 +1,123 @@
+'''
+Tests of the concurrent scraper against a local stand-in for College Results Online.
+'''
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+from graduation_rates import instrumentation
+from graduation_rates.concurrent_scraper import iter_scrape
+from graduation_rates.dataset_store import read_dataset
+from graduation_rates.page_extractor import extract_college_fields
+from graduation_rates.scrape import stream_college_results_online
+
+# IDs the stand-in answers with an empty body or a page that is not a profile page
+EMPTY_ID = "900001"
+NOT_HTML_ID = "900002"
+
+def profile_page(ipeds_id):
+    '''
+    Returns a profile page with the .data cells extract_college_fields reads.
+    '''
+    values = [f"value {index}" for index in range(50)]
+    values[3], values[11], values[20] = "CA", "Public", "Required"
+    values[13], values[19] = "1,234", "3.5"
+    values[26], values[49], values[36], values[35] = "55.5%", "12.3%", "20.1%", "30%"
+    values[27], values[28] = "$12,345", "$23,456"
+    values[21], values[22], values[24] = "550-600", "560", "24.5"
+    values[6], values[7], values[8], values[9] = "80%", "40%", "55%", "70%"
+
+    cells = "".join(f'<tr><td class="data">{value}</td></tr>' for value in values)
+    return f"<html><body><h2>College {ipeds_id}</h2><table>{cells}</table></body></html>"
+
+class StandInHandler(BaseHTTPRequestHandler):
+    '''
+    Serves /profile?institutionid=<id>, taking longer for lower IDs so that pages finish
+    out of order, and records the time of every request.
+    '''
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        ipeds_id = parse_qs(urlsplit(self.path).query)["institutionid"][0]
+        self.server.request_times.append(time.monotonic())
+
+        if ipeds_id == EMPTY_ID:
+            body = b""
+        elif ipeds_id == NOT_HTML_ID:
+            body = b"Service temporarily unavailable"
+        else:
+            time.sleep(0.01 * (9 - int(ipeds_id[-1])))
+            body = profile_page(ipeds_id).encode()
+
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):  # pylint: disable=arguments-differ
+        pass
+
+@pytest.fixture(name="stand_in")
+def fixture_stand_in():
+    '''
+    Starts the stand-in on a free local port and yields the server, whose base_url the
+    scraper appends IDs to.
+    '''
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+    server.request_times = []
+    server.base_url = f"http://127.0.0.1:{server.server_port}/profile?institutionid="
+
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+
+    server.shutdown()
+    server.server_close()
+
+def test_results_keep_the_order_of_the_links(stand_in):
+    links = [str(100000 + index) for index in range(10)]
+
+    results = list(iter_scrape(iter(links), extract_college_fields, stand_in.base_url,
+                               max_workers=4, window=5))
+
+    assert [link for link, _ in results] == links
+    assert [college_dict["college_name"] for _, college_dict in results] == [
+        f"College {link}" for link in links]
+
+def test_requests_are_rate_limited(stand_in):
+    links = [str(100000 + index) for index in range(6)]
+
+    list(iter_scrape(links, extract_college_fields, stand_in.base_url, max_workers=4,
+                     requests_per_second=20))
+
+    gaps = [later - earlier for earlier, later
+            in zip(stand_in.request_times, stand_in.request_times[1:])]
+    assert len(stand_in.request_times) == len(links)
+    assert stand_in.request_times[-1] - stand_in.request_times[0] >= 0.9 * 5 / 20
+    assert min(gaps) >= 0.9 / 20 - 0.005
+
+def test_empty_and_non_html_pages_count_as_failed(stand_in, tmp_path):
+    ids_csv = tmp_path / "ids.csv"
+    ids_csv.write_text(f"IPEDS_ID,Institution_name\n100001,One\n{EMPTY_ID},Empty\n"
+                       f"100002,Two\n{NOT_HTML_ID},Text\n", encoding="utf-8")
+    sink = tmp_path / "instrument.jsonl"
+
+    instrumentation.configure(str(sink))
+    try:
+        rows = stream_college_results_online(str(tmp_path / "scraped.parquet"), str(ids_csv),
+                                             max_workers=2, requests_per_second=None,
+                                             base_url=stand_in.base_url)
+    finally:
+        instrumentation.configure()
+
+    records = [json.loads(line) for line in sink.read_text(encoding="utf-8").splitlines()]
+    counter = next(record for record in records if record.get("name") == "rows_scraped")
+    assert rows == counter["value"] == 2
+    assert counter["rows_failed"] == 2
+    assert counter["rows_invalid"] == 0
+    assert read_dataset(str(tmp_path / "scraped.parquet"))["ipeds_id"].tolist() == [
+        100001, 100002]